@@ -18,6 +18,7 @@
         'data/sequences.xml',
         'data/expense_sequences.xml',
         'data/leads_sequences.xml',
+        'data/leads_cron.xml',
         'data/demo_data.xml',
         'views/sales_rep_views.xml',
         'views/sales_rep_assignment_views.xml',
@@ -47,6 +48,7 @@
         'data/training_sequences.xml',
         'views/incentives_rewards_views.xml',
         'data/incentives_sequences.xml',
+        'data/incentives_cron.xml',
 
 
     ],
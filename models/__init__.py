@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from . import ir_sequence
 from . import sales_rep
 from . import sales_rep_assignment
 from . import territory_assignment
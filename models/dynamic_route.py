@@ -198,7 +198,7 @@ class DynamicRoutePoint(models.Model):
     _order = 'sequence, id'
     
     route_id = fields.Many2one('dynamic.route', string='Route', required=True, ondelete='cascade')
-    route_customer_id = fields.Many2one('route.customer', string='Route Customer')
+    route_customer_id = fields.Many2one('route.customer', string='Route Customer', index=True)
     sequence = fields.Integer('Sequence', default=10)
     
     # Point Information
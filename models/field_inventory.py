@@ -2,8 +2,6 @@
 
 from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError, UserError
-from datetime import datetime, timedelta
-import json
 
 class FieldInventory(models.Model):
     _name = 'field.inventory'
@@ -57,8 +55,10 @@ class FieldInventory(models.Model):
     notes = fields.Text('Notes')
     internal_notes = fields.Text('Internal Notes')
     
-    @api.depends('name', 'sales_rep_id', 'date', 'inventory_type')
+    @api.depends('name', 'sales_rep_id.name', 'date', 'inventory_type')
     def _compute_display_name(self):
+        # Load all sales rep names in one query before the loop
+        self.mapped('sales_rep_id.name')
         for record in self:
             if record.name and record.name != _('New'):
                 record.display_name = f"{record.name} - {record.sales_rep_id.name if record.sales_rep_id else ''}"
@@ -67,24 +67,47 @@ class FieldInventory(models.Model):
     
     @api.depends('inventory_line_ids.quantity', 'inventory_line_ids.unit_price')
     def _compute_totals(self):
+        # Saved inventories are aggregated in one SQL query, unsaved form
+        # records (NewId) still sum their lines in Python
+        stored = self.filtered(lambda r: isinstance(r.id, int))
+        totals = {}
+        if stored:
+            self.env['field.inventory.line'].flush_model(['inventory_id', 'quantity', 'unit_price'])
+            self.env.cr.execute("""
+                SELECT inventory_id, SUM(quantity), SUM(quantity * unit_price)
+                FROM field_inventory_line
+                WHERE inventory_id = ANY(%s)
+                GROUP BY inventory_id
+            """, (stored.ids,))
+            totals = {inventory_id: (qty, value) for inventory_id, qty, value in self.env.cr.fetchall()}
         for record in self:
-            total_qty = sum(line.quantity for line in record.inventory_line_ids)
-            total_val = sum(line.quantity * line.unit_price for line in record.inventory_line_ids)
+            if isinstance(record.id, int):
+                total_qty, total_val = totals.get(record.id, (0.0, 0.0))
+            else:
+                total_qty = sum(line.quantity for line in record.inventory_line_ids)
+                total_val = sum(line.quantity * line.unit_price for line in record.inventory_line_ids)
             record.total_quantity = total_qty
             record.total_value = total_val
     
-    @api.model
-    def create(self, vals):
-        if vals.get('name', _('New')) == _('New'):
-            vals['name'] = self.env['ir.sequence'].next_by_code('field.inventory') or _('New')
-        return super(FieldInventory, self).create(vals)
+    @api.model_create_multi
+    def create(self, vals_list):
+        vals_to_name = [vals for vals in vals_list if vals.get('name', _('New')) == _('New')]
+        if vals_to_name:
+            names = self.env['ir.sequence']._next_by_code_batch('field.inventory', len(vals_to_name))
+            for vals, name in zip(vals_to_name, names):
+                vals['name'] = name or _('New')
+        return super(FieldInventory, self).create(vals_list)
     
     def action_confirm(self):
         """Confirm the inventory operation"""
+        line_data = self.env['field.inventory.line'].read_group(
+            [('inventory_id', 'in', self.ids)],
+            ['inventory_id'], ['inventory_id'])
+        with_lines = {data['inventory_id'][0] for data in line_data}
+        if self.filtered(lambda r: r.id not in with_lines):
+            raise ValidationError(_("Cannot confirm inventory without lines."))
+        self.write({'state': 'confirmed'})
         for record in self:
-            if not record.inventory_line_ids:
-                raise ValidationError(_("Cannot confirm inventory without lines."))
-            record.state = 'confirmed'
             record.message_post(body=_("Inventory operation confirmed."))
     
     def action_start(self):
@@ -156,12 +179,14 @@ class FieldInventoryLine(models.Model):
     
     # Quantities
     quantity = fields.Float('Quantity', required=True, default=1.0)
-    uom_id = fields.Many2one('uom.uom', string='Unit of Measure', related='product_id.uom_id', readonly=True)
+    uom_id = fields.Many2one('uom.uom', string='Unit of Measure', related='product_id.uom_id', store=True, readonly=True)
     
     # Pricing
-    unit_price = fields.Monetary('Unit Price', required=True)
+    unit_price = fields.Monetary('Unit Price', required=True, compute='_compute_unit_price',
+                                 store=True, readonly=False, precompute=True)
     currency_id = fields.Many2one('res.currency', related='inventory_id.currency_id', readonly=True)
-    subtotal = fields.Monetary('Subtotal', compute='_compute_subtotal', store=True)
+    # Filled by PostgreSQL as a generated column, see init()
+    subtotal = fields.Monetary('Subtotal', readonly=True, copy=False)
     
     # Stock Information
     lot_id = fields.Many2one('stock.lot', string='Lot/Serial Number')
@@ -173,15 +198,53 @@ class FieldInventoryLine(models.Model):
     # Notes
     notes = fields.Text('Notes')
     
-    @api.depends('quantity', 'unit_price')
-    def _compute_subtotal(self):
+    def init(self):
+        # Let PostgreSQL maintain the subtotal instead of recomputing it in Python
+        self.env.cr.execute("""
+            SELECT is_generated FROM information_schema.columns
+            WHERE table_name = %s AND column_name = 'subtotal'
+        """, (self._table,))
+        row = self.env.cr.fetchone()
+        if row and row[0] == 'ALWAYS':
+            return
+        # field_inventory_report reads the column: drop it first, its own init() recreates it.
+        # No CASCADE, so any other dependent object makes the upgrade fail loudly.
+        tools.drop_view_if_exists(self.env.cr, 'field_inventory_report')
+        self.env.cr.execute("""
+            ALTER TABLE %s DROP COLUMN IF EXISTS subtotal;
+            ALTER TABLE %s ADD COLUMN subtotal numeric
+                GENERATED ALWAYS AS (quantity * unit_price) STORED;
+        """ % (self._table, self._table))
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super(FieldInventoryLine, self).create(vals_list)
+        lines.invalidate_recordset(['subtotal'])
+        return lines
+    
+    def write(self, vals):
+        res = super(FieldInventoryLine, self).write(vals)
+        # The operands may change through recomputes as well as through vals:
+        # store them and drop the cached value of the generated column
+        self.flush_recordset(['quantity', 'unit_price'])
+        self.invalidate_recordset(['subtotal'])
+        return res
+    
+    @api.onchange('quantity', 'unit_price')
+    def _onchange_subtotal(self):
+        # Mirror the generated column in the form until the line is saved
         for line in self:
             line.subtotal = line.quantity * line.unit_price
     
-    @api.onchange('product_id')
-    def _onchange_product_id(self):
-        if self.product_id:
-            self.unit_price = self.product_id.list_price
+    @api.depends('product_id')
+    def _compute_unit_price(self):
+        for line in self:
+            if line.product_id:
+                line.unit_price = line.product_id.list_price
+            else:
+                # No product to price from: keep the manually entered price, but assign it
+                # anyway, the ORM requires every record of a compute to get a value
+                line.unit_price = line.unit_price
     
     @api.constrains('quantity')
     def _check_quantity(self):
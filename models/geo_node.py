@@ -1,8 +1,34 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api, _
+from collections import defaultdict
+
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError
 
+# Define the hierarchy order
+HIERARCHY_ORDER = {
+    'country': 0,
+    'region': 1,
+    'governorate': 2,
+    'city': 3,
+    'district': 4,
+    'zone': 5,
+    'neighborhood': 6,
+    'block': 7,
+}
+
+# Define valid parent-child relationships
+VALID_PARENTS = {
+    'country': (),  # Country has no parent
+    'region': ('country',),
+    'governorate': ('region', 'country'),
+    'city': ('governorate', 'region', 'country'),
+    'district': ('city',),
+    'zone': ('district', 'city'),
+    'neighborhood': ('zone', 'district'),
+    'block': ('neighborhood',),
+}
+
 class GeoNode(models.Model):
     _name = 'geo.node'
     _description = 'Geographic Node'
@@ -14,7 +40,7 @@ class GeoNode(models.Model):
     
     name = fields.Char(string='Name', required=True, tracking=True)
     complete_name = fields.Char(string='Complete Name', compute='_compute_complete_name', store=True)
-    code = fields.Char(string='Code', tracking=True, help='Auto-generated sequential code based on hierarchy')
+    code = fields.Char(string='Code', tracking=True, index=True, help='Auto-generated sequential code based on hierarchy')
     active = fields.Boolean(default=True, tracking=True)
     
     # Hierarchy fields
@@ -56,6 +82,11 @@ class GeoNode(models.Model):
         store=True
     )
     
+    def init(self):
+        # Supports the "last sibling code" lookup in _generate_sequential_codes
+        tools.create_index(self.env.cr, 'geo_node_parent_type_code_idx',
+                           self._table, ['parent_id', 'type', 'code'])
+    
     @api.depends('name', 'parent_id.complete_name')
     def _compute_complete_name(self):
         for node in self:
@@ -66,53 +97,34 @@ class GeoNode(models.Model):
     
     @api.constrains('parent_id', 'type')
     def _check_hierarchy(self):
-        # Define the hierarchy order
-        hierarchy_order = {
-            'country': 0,
-            'region': 1,
-            'governorate': 2,
-            'city': 3,
-            'district': 4,
-            'zone': 5,
-            'neighborhood': 6,
-            'block': 7,
-        }
-        
-        # Define valid parent-child relationships
-        valid_parents = {
-            'country': [],  # Country has no parent
-            'region': ['country'],
-            'governorate': ['region', 'country'],
-            'city': ['governorate', 'region', 'country'],
-            'district': ['city'],
-            'zone': ['district', 'city'],
-            'neighborhood': ['zone', 'district'],
-            'block': ['neighborhood'],
-        }
+        type_labels = dict(self._fields['type'].selection)
+        # Read all parent types in one query before validating
+        self.mapped('parent_id.type')
         
         for node in self:
             if node.parent_id:
+                parent_type = node.parent_id.type
                 # Check if parent type is valid for this node type
-                if node.parent_id.type not in valid_parents.get(node.type, []):
-                    valid_parent_types = ', '.join([dict(node._fields['type'].selection)[t] for t in valid_parents.get(node.type, [])])
+                if parent_type not in VALID_PARENTS.get(node.type, ()):
+                    valid_parent_types = ', '.join([type_labels[t] for t in VALID_PARENTS.get(node.type, ())])
                     raise ValidationError(_('Invalid hierarchy: %s cannot be a child of %s.\n\nCorrect hierarchy order: Country → Region/State → Governorate/Province → City → District → Zone → Neighborhood → Block/Street\n\nValid parent types for %s: %s') % 
-                                        (dict(node._fields['type'].selection)[node.type],
-                                         dict(node._fields['type'].selection)[node.parent_id.type],
-                                         dict(node._fields['type'].selection)[node.type],
+                                        (type_labels[node.type],
+                                         type_labels[parent_type],
+                                         type_labels[node.type],
                                          valid_parent_types or 'None (top level only)'))
                 
                 # Check hierarchy order (parent must be higher in hierarchy)
-                parent_order = hierarchy_order.get(node.parent_id.type, 999)
-                child_order = hierarchy_order.get(node.type, 999)
+                parent_order = HIERARCHY_ORDER.get(parent_type, 999)
+                child_order = HIERARCHY_ORDER.get(node.type, 999)
                 if parent_order >= child_order:
                     raise ValidationError(_('Invalid hierarchy order: %s must be higher than %s in the hierarchy.') % 
-                                        (dict(node._fields['type'].selection)[node.parent_id.type],
-                                         dict(node._fields['type'].selection)[node.type]))
+                                        (type_labels[parent_type],
+                                         type_labels[node.type]))
             else:
                 # Only country can be at the top level
                 if node.type != 'country':
                     raise ValidationError(_('Only Country nodes can be at the top level. %s must have a parent.') % 
-                                        dict(node._fields['type'].selection)[node.type])
+                                        type_labels[node.type])
     
     def _compute_partner_count(self):
         # This will be implemented in later phases with actual partner data
@@ -165,33 +177,91 @@ class GeoNode(models.Model):
     def write(self, vals):
         # Regenerate code if parent changes
         if 'parent_id' in vals and not vals.get('code'):
+            if len(self) > 1:
+                return self._write_with_sequential_codes(vals)
             for record in self:
                 vals['code'] = self._generate_sequential_code(vals.get('parent_id', record.parent_id.id), vals.get('type', record.type))
         return super(GeoNode, self).write(vals)
     
+    def _write_with_sequential_codes(self, vals):
+        """Move several nodes at once, giving each one its own sequential code
+        
+        The new codes are stored with a single raw UPDATE. This bypasses the
+        ``_check_code_unique`` constraint on purpose: the codes come from
+        ``_generate_sequential_codes`` under the allocation lock, so they cannot
+        collide, and checking them would cost one query per node. Tracking of
+        ``code`` is kept: the old codes are registered for tracking before the
+        write, and the tracking message (old code -> new code) is logged at commit
+        from the values read back after the UPDATE.
+        """
+        if not self.env.context.get('tracking_disable') and not self.env.context.get('mail_notrack'):
+            self._track_prepare(['code'])
+        groups = defaultdict(list)
+        for record in self:
+            groups[vals.get('type', record.type)].append(record.id)
+        codes = {}
+        for node_type, node_ids in groups.items():
+            new_codes = self._generate_sequential_codes(vals['parent_id'], node_type, len(node_ids), exclude_ids=self.ids)
+            codes.update(zip(node_ids, new_codes))
+        # Clear the old codes first so the moved nodes never collide with each other;
+        # the ORM updates parent_path for the whole batch in one statement
+        res = super(GeoNode, self).write(dict(vals, code=False))
+        # Fill all new codes with a single UPDATE instead of one write per node
+        self.env.cr.execute("""
+            UPDATE geo_node
+            SET code = new_codes.code
+            FROM unnest(%s::int[], %s::varchar[]) AS new_codes(id, code)
+            WHERE geo_node.id = new_codes.id
+        """, (list(codes), list(codes.values())))
+        # Drop the cached False so tracking and readers see the new codes
+        self.invalidate_recordset(['code'])
+        return res
+    
+    def _lock_sequential_code(self, parent_id, node_type):
+        """Serialize code allocation between concurrent transactions.
+
+        Two transactions allocating under the same parent both update the
+        parent row, so the later one fails with a serialization error and is
+        retried by Odoo with a fresh snapshot instead of reusing the same code.
+        Top-level nodes have no parent row and use an advisory lock instead.
+        """
+        if parent_id:
+            self.env.cr.execute("UPDATE geo_node SET code = code WHERE id = %s", (parent_id,))
+        else:
+            self.env.cr.execute("SELECT pg_advisory_xact_lock(hashtext(%s))",
+                                ('geo_node_code/%s' % node_type,))
+    
     def _generate_sequential_code(self, parent_id, node_type):
         """Generate sequential code based on parent hierarchy"""
+        return self._generate_sequential_codes(parent_id, node_type)[0]
+    
+    def _generate_sequential_codes(self, parent_id, node_type, count=1, exclude_ids=None):
+        """Generate ``count`` consecutive codes based on parent hierarchy"""
+        self._lock_sequential_code(parent_id, node_type)
+        domain = [('type', '=', node_type)]
+        if exclude_ids:
+            domain.append(('id', 'not in', exclude_ids))
         if not parent_id:
             # For top-level (country) nodes, use simple sequential numbering
-            last_code = self.search([('parent_id', '=', False), ('type', '=', node_type)], 
+            last_code = self.search([('parent_id', '=', False)] + domain, 
                                   order='code desc', limit=1)
             if last_code and last_code.code and last_code.code.isdigit():
-                return str(int(last_code.code) + 1).zfill(2)
+                first_number = int(last_code.code) + 1
             else:
-                return '01'
+                first_number = 1
+            return [str(first_number + i).zfill(2) for i in range(count)]
         else:
             # For child nodes, use parent code + sequential number
             parent = self.browse(parent_id)
             if not parent.exists():
-                return '001'
+                return ['001'] * count
             
             parent_code = parent.code or '00'
             
             # Find the last child with the same parent and type
             siblings = self.search([
                 ('parent_id', '=', parent_id),
-                ('type', '=', node_type)
-            ], order='code desc', limit=1)
+            ] + domain, order='code desc', limit=1)
             
             if siblings and siblings.code:
                 # Extract the last part of the code (after parent code)
@@ -206,8 +276,8 @@ class GeoNode(models.Model):
             else:
                 next_number = 1
             
-            # Generate new code: parent_code + sequential_number
-            return parent_code + str(next_number).zfill(2)
+            # Generate new codes: parent_code + sequential_number
+            return [parent_code + str(next_number + i).zfill(2) for i in range(count)]
     
     def action_fix_hierarchy(self):
         """Fix hierarchy issues by reorganizing nodes according to proper structure"""
@@ -264,8 +334,8 @@ class GeoNode(models.Model):
             })
         
         # Move all problematic regions under the country
-        for region in problematic_regions:
-            region.write({
+        if problematic_regions:
+            problematic_regions.write({
                 'parent_id': country.id,
                 'code': False  # Will be regenerated
             })
@@ -277,23 +347,39 @@ class GeoNode(models.Model):
             ('parent_id.type', 'not in', ['district', 'city'])
         ])
         
+        # Load the district/city candidates once and match zone names in memory
+        # instead of running one ilike search per zone
+        candidates = [(parent.id, (parent.name or '').lower())
+                      for parent in self.search([('type', 'in', ['district', 'city'])])]
+        matches = {}
+        default_city = self.browse()
+        zone_ids_by_parent = defaultdict(list)
+        
         for zone in problematic_zones:
-            # Try to find a suitable parent (district or city)
-            suitable_parent = self.search([
-                ('type', 'in', ['district', 'city']),
-                ('name', 'ilike', zone.name[:10])  # Try to match by name similarity
-            ], limit=1)
+            # Try to find a suitable parent (district or city) by name similarity
+            needle = zone.name[:10].lower()
+            if needle not in matches:
+                matches[needle] = next((parent_id for parent_id, name in candidates if needle in name), False)
+            suitable_parent_id = matches[needle]
             
-            if not suitable_parent:
-                # Create a default city under the country
-                suitable_parent = self.create({
-                    'name': 'مدينة افتراضية',
-                    'type': 'city',
-                    'parent_id': country.id
-                })
+            if not suitable_parent_id:
+                if not default_city:
+                    # Create a default city under the country
+                    default_city = self.create({
+                        'name': 'مدينة افتراضية',
+                        'type': 'city',
+                        'parent_id': country.id
+                    })
+                    candidates.append((default_city.id, default_city.name.lower()))
+                    matches = {}
+                suitable_parent_id = default_city.id
             
-            zone.write({
-                'parent_id': suitable_parent.id,
+            zone_ids_by_parent[suitable_parent_id].append(zone.id)
+        
+        # One write per target parent instead of one per zone
+        for parent_id, zone_ids in zone_ids_by_parent.items():
+            self.browse(zone_ids).write({
+                'parent_id': parent_id,
                 'code': False  # Will be regenerated
             })
         
@@ -1,10 +1,50 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
+from odoo.tools import SQL
 from odoo.exceptions import ValidationError
 from datetime import datetime, timedelta
 import json
-import math
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from math import asin, cos, hypot, radians, sin, sqrt
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+def _haversine_cos(lat1, lon1, cos_lat1, lat2, lon2, cos_lat2):
+    """Haversine distance in kilometers for points in radians with known cos(latitude)"""
+    sin_dlat = sin((lat2 - lat1) * 0.5)
+    sin_dlon = sin((lon2 - lon1) * 0.5)
+    a = sin_dlat * sin_dlat + cos_lat1 * cos_lat2 * sin_dlon * sin_dlon
+    return 2.0 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+def _haversine_rad(lat1, lon1, lat2, lon2):
+    """Great-circle distance in kilometers between two points given in radians"""
+    return _haversine_cos(lat1, lon1, cos(lat1), lat2, lon2, cos(lat2))
+
+
+def _equirect_cos(lat1, lon1, cos_lat1, lat2, lon2):
+    """Equirectangular distance in kilometers for nearby points in radians.
+    
+    Accurate to well under a meter at the ~1 km ranges used for customer
+    proximity, with a single precomputed cosine and no other trigonometry.
+    """
+    return EARTH_RADIUS_KM * hypot((lon2 - lon1) * cos_lat1, lat2 - lat1)
+
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in kilometers between two points given in degrees"""
+    return _haversine_rad(radians(lat1), radians(lon1), radians(lat2), radians(lon2))
+
+
+def _format_address(lat, lng):
+    """Placeholder for reverse geocoding: format the coordinates"""
+    if lat and lng:
+        return f"Lat: {lat:.6f}, Lng: {lng:.6f}"
+    return ''
 
 class GPSTracking(models.Model):
     _name = 'gps.tracking'
@@ -27,7 +67,7 @@ class GPSTracking(models.Model):
     heading = fields.Float('Heading (degrees)', digits=(8, 2))
     
     # Address Information
-    address = fields.Char('Address', compute='_compute_address', store=True)
+    address = fields.Char('Address', compute='_compute_address')
     city = fields.Char('City')
     state = fields.Char('State')
     country = fields.Char('Country')
@@ -52,7 +92,7 @@ class GPSTracking(models.Model):
     validation_notes = fields.Text('Validation Notes')
     
     # Distance Calculations
-    distance_from_previous = fields.Float('Distance from Previous (km)', compute='_compute_distances', store=True)
+    distance_from_previous = fields.Float('Distance from Previous (km)', compute='_compute_distances')
     distance_to_customer = fields.Float('Distance to Customer (km)', compute='_compute_customer_distance', store=True)
     
     # Battery and Device Info
@@ -68,6 +108,21 @@ class GPSTracking(models.Model):
     is_in_territory = fields.Boolean('In Assigned Territory', compute='_compute_territory_status', store=True)
     territory_id = fields.Many2one('territory.assignment', string='Current Territory')
     
+    def init(self):
+        # Previous-point lookups and get_route_data walk a rep's points by timestamp
+        tools.create_index(self.env.cr, 'gps_tracking_rep_timestamp_idx',
+                           self._table, ['sales_rep_id', 'timestamp'])
+        # Haversine in SQL so distances and route totals are computed by PostgreSQL
+        self.env.cr.execute("""
+            CREATE OR REPLACE FUNCTION gps_haversine_km(lat1 float8, lon1 float8, lat2 float8, lon2 float8)
+            RETURNS float8 LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+                SELECT 2 * 6371.0 * asin(sqrt(
+                    power(sin(radians($3 - $1) / 2), 2)
+                    + cos(radians($1)) * cos(radians($3)) * power(sin(radians($4 - $2) / 2), 2)
+                ))
+            $$
+        """)
+    
     @api.depends('sales_rep_id', 'timestamp', 'tracking_type')
     def _compute_display_name(self):
         for record in self:
@@ -80,33 +135,52 @@ class GPSTracking(models.Model):
     def _compute_address(self):
         # This would integrate with a geocoding service
         for record in self:
-            if record.latitude and record.longitude:
-                # Placeholder for reverse geocoding
-                record.address = f"Lat: {record.latitude:.6f}, Lng: {record.longitude:.6f}"
-            else:
-                record.address = ''
+            record.address = _format_address(record.latitude, record.longitude)
     
     @api.depends('sales_rep_id', 'timestamp', 'latitude', 'longitude')
     def _compute_distances(self):
+        distances = self._get_previous_distances()
         for record in self:
-            if not record.sales_rep_id or not record.latitude or not record.longitude:
-                record.distance_from_previous = 0
-                continue
-            
-            # Find previous location
-            previous = self.search([
-                ('sales_rep_id', '=', record.sales_rep_id.id),
-                ('timestamp', '<', record.timestamp),
-                ('id', '!=', record.id)
-            ], limit=1, order='timestamp desc')
-            
-            if previous and previous.latitude and previous.longitude:
-                record.distance_from_previous = self._calculate_distance(
-                    record.latitude, record.longitude,
-                    previous.latitude, previous.longitude
-                )
-            else:
-                record.distance_from_previous = 0
+            record.distance_from_previous = distances.get(record.id, 0)
+    
+    def _get_previous_distances(self):
+        """Return {id: distance in km from the previous point of the same sales rep}"""
+        stored = self.filtered(lambda r: isinstance(r.id, int))
+        distances = {}
+        if stored:
+            # One query for the whole recordset instead of one search per point;
+            # PostgreSQL evaluates the trigonometry, Python only reads results
+            self.flush_model(['sales_rep_id', 'timestamp', 'latitude', 'longitude'])
+            self.env.cr.execute("""
+                SELECT g.id, gps_haversine_km(prev.latitude, prev.longitude, g.latitude, g.longitude)
+                FROM gps_tracking g
+                JOIN LATERAL (
+                    SELECT p.latitude, p.longitude
+                    FROM gps_tracking p
+                    WHERE p.sales_rep_id = g.sales_rep_id
+                      AND p.timestamp < g.timestamp
+                      AND p.id != g.id
+                    ORDER BY p.timestamp DESC
+                    LIMIT 1
+                ) prev ON TRUE
+                WHERE g.id = ANY(%s)
+                  AND g.latitude != 0 AND g.longitude != 0
+                  AND prev.latitude != 0 AND prev.longitude != 0
+            """, (stored.ids,))
+            distances = dict(self.env.cr.fetchall())
+        # Unsaved records (onchange) are not in the database yet
+        for record in self - stored:
+            if record.sales_rep_id and record.timestamp and record.latitude and record.longitude:
+                previous = self.search([
+                    ('sales_rep_id', '=', record.sales_rep_id.id),
+                    ('timestamp', '<', record.timestamp),
+                ], limit=1, order='timestamp desc')
+                if previous.latitude and previous.longitude:
+                    distances[record.id] = self._calculate_distance(
+                        record.latitude, record.longitude,
+                        previous.latitude, previous.longitude
+                    )
+        return distances
     
     @api.depends('latitude', 'longitude', 'customer_id')
     def _compute_customer_distance(self):
@@ -125,6 +199,14 @@ class GPSTracking(models.Model):
     
     @api.depends('latitude', 'longitude', 'sales_rep_id')
     def _compute_territory_status(self):
+        # Load the active territories of all involved reps at once
+        territories_by_rep = defaultdict(list)
+        for territory in self.env['territory.assignment'].search([
+            ('sales_rep_id', 'in', self.sales_rep_id.ids),
+            ('active', '=', True)
+        ]):
+            territories_by_rep[territory.sales_rep_id.id].append(territory)
+        
         for record in self:
             if not record.latitude or not record.longitude or not record.sales_rep_id:
                 record.is_in_territory = False
@@ -132,10 +214,7 @@ class GPSTracking(models.Model):
                 continue
             
             # Check if location is within assigned territories
-            territories = self.env['territory.assignment'].search([
-                ('sales_rep_id', '=', record.sales_rep_id.id),
-                ('active', '=', True)
-            ])
+            territories = territories_by_rep[record.sales_rep_id.id]
             
             in_territory = False
             territory_found = False
@@ -153,20 +232,7 @@ class GPSTracking(models.Model):
     
     def _calculate_distance(self, lat1, lon1, lat2, lon2):
         """Calculate distance between two points using Haversine formula"""
-        R = 6371  # Earth's radius in kilometers
-        
-        lat1_rad = math.radians(lat1)
-        lon1_rad = math.radians(lon1)
-        lat2_rad = math.radians(lat2)
-        lon2_rad = math.radians(lon2)
-        
-        dlat = lat2_rad - lat1_rad
-        dlon = lon2_rad - lon1_rad
-        
-        a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        
-        return R * c
+        return _haversine_km(lat1, lon1, lat2, lon2)
     
     def _point_in_territory(self, lat, lng, territory):
         """Check if a point is within a territory boundary"""
@@ -175,69 +241,152 @@ class GPSTracking(models.Model):
         return True
     
     @api.model
-    def create_tracking_point(self, vals):
-        """API method to create tracking point from mobile app"""
+    def create_tracking_point(self, vals_list):
+        """API method to create tracking points from mobile app.
+        
+        Accepts a single dict or a list of dicts (points buffered offline)
+        and creates them all in one batch.
+        """
+        if isinstance(vals_list, dict):
+            vals_list = [vals_list]
+        
         # Validate required fields
         required_fields = ['sales_rep_id', 'latitude', 'longitude']
-        for field in required_fields:
-            if field not in vals:
-                raise ValidationError(_(f"Missing required field: {field}"))
+        for vals in vals_list:
+            for field in required_fields:
+                if field not in vals:
+                    raise ValidationError(_(f"Missing required field: {field}"))
         
-        # Auto-detect nearby customers
-        if 'customer_id' not in vals:
-            customer = self._find_nearby_customer(vals['latitude'], vals['longitude'])
+        # Auto-detect nearby customers for the whole batch at once
+        to_match = [vals for vals in vals_list if 'customer_id' not in vals]
+        customers = self._find_nearby_customers([(vals['latitude'], vals['longitude']) for vals in to_match])
+        for vals, customer in zip(to_match, customers):
             if customer:
                 vals['customer_id'] = customer.id
         
-        return self.create(vals)
+        return self.create(vals_list)
     
     def _find_nearby_customer(self, lat, lng, radius_km=1.0):
-        """Find nearby customers within specified radius"""
+        """Find the nearest customer within specified radius"""
+        return self._find_nearby_customers([(lat, lng)], radius_km)[0]
+    
+    def _find_nearby_customers(self, points, radius_km=1.0):
+        """Find the nearest customer within radius of each ``(lat, lng)`` point.
+        
+        Returns one partner (or None) per point. The customer criteria are
+        checked with a single search over the shortlists of all points.
+        """
+        shortlists = [self._query_customer_index(lat, lng, radius_km) for lat, lng in points]
+        candidate_ids = {partner_id for shortlist in shortlists for distance, partner_id in shortlist}
+        if not candidate_ids:
+            return [None] * len(points)
+        
+        # The index only holds coordinates; check the customer criteria on the shortlists
         customers = self.env['res.partner'].search([
-            ('is_company', '=', True),
+            ('id', 'in', list(candidate_ids)),
             ('customer_rank', '>', 0),
-            ('partner_latitude', '!=', 0),
-            ('partner_longitude', '!=', 0)
         ])
+        customer_ids = set(customers.ids)
+        nearest = []
+        for shortlist in shortlists:
+            partner_id = next((partner_id for distance, partner_id in shortlist if partner_id in customer_ids), False)
+            nearest.append(customers.browse(partner_id) if partner_id else None)
+        return nearest
+    
+    def _query_customer_index(self, lat, lng, radius_km):
+        """Return ``(distance, partner_id)`` of indexed partners within radius, nearest first"""
+        latitudes, entries = self._get_customer_index()
+        # Only partners inside the latitude band can be within the radius
+        delta = radius_km / KM_PER_DEGREE
+        start = bisect_left(latitudes, lat - delta)
+        end = bisect_right(latitudes, lat + delta)
         
-        for customer in customers:
-            distance = self._calculate_distance(
-                lat, lng,
-                customer.partner_latitude,
-                customer.partner_longitude
-            )
+        # Cheap longitude test before any trigonometry on the candidate
+        lat_rad = radians(lat)
+        lng_rad = radians(lng)
+        # cos(latitude) of the query point is shared by every pair
+        cos_lat = cos(lat_rad)
+        lng_delta = delta / max(cos_lat, 1e-6)
+        candidates = []
+        for partner_lat, partner_lng, partner_id, partner_lat_rad, partner_lng_rad in entries[start:end]:
+            if abs(partner_lng - lng) > lng_delta:
+                continue
+            distance = _equirect_cos(lat_rad, lng_rad, cos_lat, partner_lat_rad, partner_lng_rad)
             if distance <= radius_km:
-                return customer
+                candidates.append((distance, partner_id))
+        candidates.sort()
+        return candidates
+    
+    @api.model
+    def _get_customer_index(self):
+        """Company partners with coordinates, sorted by latitude.
         
-        return None
+        Returns ``(latitudes, entries)`` where entries are
+        ``(latitude, longitude, partner_id, latitude_rad, longitude_rad)``
+        tuples, so distance checks never convert degrees again. The cached
+        index is keyed on a version that ``res.partner`` bumps whenever the
+        coordinates of a company partner change, see below.
+        """
+        self.env.cr.execute("SELECT last_value FROM gps_customer_index_version_seq")
+        return self._get_customer_index_cached(self.env.cr.fetchone()[0])
+    
+    @api.model
+    @tools.ormcache('self.env.uid', 'tuple(self.env.companies.ids)', 'version')
+    def _get_customer_index_cached(self, version):
+        query = self.env['res.partner']._search([
+            ('is_company', '=', True),
+            ('partner_latitude', '!=', 0),
+            ('partner_longitude', '!=', 0)
+        ])
+        # Raw float8 rows: no per-value ORM conversion of the numeric columns
+        self.env['res.partner'].flush_model(['partner_latitude', 'partner_longitude', 'is_company', 'active'])
+        self.env.cr.execute(query.select(
+            SQL('%s::float8', SQL.identifier(query.table, 'partner_latitude')),
+            SQL('%s::float8', SQL.identifier(query.table, 'partner_longitude')),
+            SQL.identifier(query.table, 'id'),
+        ))
+        entries = tuple(sorted(
+            (lat, lng, partner_id, radians(lat), radians(lng))
+            for lat, lng, partner_id in self.env.cr.fetchall()
+        ))
+        return tuple(entry[0] for entry in entries), entries
     
     @api.model
     def get_route_data(self, sales_rep_id, date_from=None, date_to=None):
         """Get route data for mapping"""
-        domain = [('sales_rep_id', '=', sales_rep_id)]
+        self.check_access('read')
+        self.flush_model()
         
+        query = """
+            SELECT g.id, g.latitude::float8, g.longitude::float8, g.timestamp, g.tracking_type,
+                   p.name, g.speed::float8, g.accuracy::float8
+            FROM gps_tracking g
+            LEFT JOIN res_partner p ON p.id = g.customer_id
+            WHERE g.sales_rep_id = %s
+        """
+        params = [sales_rep_id]
         if date_from:
-            domain.append(('timestamp', '>=', date_from))
+            query += " AND g.timestamp >= %s"
+            params.append(date_from)
         if date_to:
-            domain.append(('timestamp', '<=', date_to))
-        
-        tracking_points = self.search(domain, order='timestamp')
+            query += " AND g.timestamp <= %s"
+            params.append(date_to)
+        query += " ORDER BY g.timestamp"
         
-        route_data = []
-        for point in tracking_points:
-            route_data.append({
-                'id': point.id,
-                'lat': point.latitude,
-                'lng': point.longitude,
-                'timestamp': point.timestamp.isoformat(),
-                'type': point.tracking_type,
-                'address': point.address,
-                'customer': point.customer_id.name if point.customer_id else None,
-                'speed': point.speed,
-                'accuracy': point.accuracy
-            })
-        
-        return route_data
+        # One query, no ORM records: rows map directly to the JSON payload
+        self.env.cr.execute(query, params)
+        return [{
+            'id': point_id,
+            'lat': lat,
+            'lng': lng,
+            'timestamp': timestamp.isoformat(),
+            'type': tracking_type,
+            'address': _format_address(lat, lng),
+            'customer': customer,
+            'speed': speed,
+            'accuracy': accuracy
+        } for point_id, lat, lng, timestamp, tracking_type, customer, speed, accuracy
+            in self.env.cr.fetchall()]
     
     def action_validate_location(self):
         """Validate location manually"""
@@ -283,24 +432,23 @@ class GPSTrackingRoute(models.Model):
         for route in self:
             route.point_count = len(route.tracking_point_ids)
     
-    @api.depends('tracking_point_ids.distance_from_previous', 'tracking_point_ids.timestamp')
+    @api.depends('tracking_point_ids.latitude', 'tracking_point_ids.longitude', 'tracking_point_ids.timestamp')
     def _compute_route_stats(self):
+        route_stats = self._read_route_stats()
         for route in self:
-            if not route.tracking_point_ids:
+            total_distance, duration_seconds, point_count = route_stats.get(route.id, (0, 0, 0))
+            if not point_count:
                 route.total_distance = 0
                 route.total_duration = 0
                 route.average_speed = 0
                 continue
             
             # Calculate total distance
-            route.total_distance = sum(route.tracking_point_ids.mapped('distance_from_previous'))
+            route.total_distance = total_distance
             
             # Calculate duration
-            points = route.tracking_point_ids.sorted('timestamp')
-            if len(points) > 1:
-                start_time = points[0].timestamp
-                end_time = points[-1].timestamp
-                duration = (end_time - start_time).total_seconds() / 3600  # Convert to hours
+            if point_count > 1:
+                duration = duration_seconds / 3600  # Convert to hours
                 route.total_duration = duration
                 
                 # Calculate average speed
@@ -312,6 +460,41 @@ class GPSTrackingRoute(models.Model):
                 route.total_duration = 0
                 route.average_speed = 0
     
+    def _read_route_stats(self):
+        """Return {route_id: (total_distance, duration_seconds, point_count)}"""
+        routes = self.filtered(lambda r: isinstance(r.id, int))
+        route_stats = {}
+        if routes:
+            # Aggregate all routes in one GROUP BY instead of loading their points;
+            # each step is measured from the previous point of the same route
+            self.env['gps.tracking'].flush_model(['route_id', 'timestamp', 'latitude', 'longitude'])
+            self.env.cr.execute("""
+                SELECT route_id, COALESCE(SUM(step), 0),
+                       EXTRACT(EPOCH FROM MAX(timestamp) - MIN(timestamp))::float8, COUNT(*)
+                FROM (
+                    SELECT route_id, timestamp,
+                           CASE WHEN latitude != 0 AND longitude != 0
+                                     AND LAG(latitude) OVER w != 0 AND LAG(longitude) OVER w != 0
+                                THEN gps_haversine_km(LAG(latitude) OVER w, LAG(longitude) OVER w,
+                                                      latitude, longitude)
+                           END AS step
+                    FROM gps_tracking
+                    WHERE route_id = ANY(%s)
+                    WINDOW w AS (PARTITION BY route_id ORDER BY timestamp)
+                ) points
+                GROUP BY route_id
+            """, (routes.ids,))
+            route_stats = {row[0]: row[1:] for row in self.env.cr.fetchall()}
+        # Unsaved routes (onchange) only exist in memory
+        for route in self - routes:
+            points = route.tracking_point_ids
+            if points:
+                timestamps = points.mapped('timestamp')
+                route_stats[route.id] = (sum(points.mapped('distance_from_previous')),
+                                         (max(timestamps) - min(timestamps)).total_seconds(),
+                                         len(points))
+        return route_stats
+    
     @api.depends('total_distance', 'total_duration')
     def _compute_efficiency(self):
         for route in self:
@@ -332,4 +515,69 @@ class GPSTrackingRoute(models.Model):
 class GPSTrackingExtended(models.Model):
     _inherit = 'gps.tracking'
     
-    route_id = fields.Many2one('gps.tracking.route', string='Route')
\ No newline at end of file
+    route_id = fields.Many2one('gps.tracking.route', string='Route')
+    
+    def init(self):
+        super(GPSTrackingExtended, self).init()
+        # Route statistics scan a route's points ordered by timestamp
+        tools.create_index(self.env.cr, 'gps_tracking_route_timestamp_idx',
+                           self._table, ['route_id', 'timestamp'])
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+    
+    _GPS_INDEX_FIELDS = {'partner_latitude', 'partner_longitude', 'is_company', 'active', 'company_id'}
+    
+    def init(self):
+        super().init()
+        # Version of the gps.tracking customer index; non-transactional, shared by all workers
+        self.env.cr.execute("CREATE SEQUENCE IF NOT EXISTS gps_customer_index_version_seq")
+    
+    def _get_gps_index_state(self):
+        """Indexed data of the company partners with coordinates in this recordset"""
+        return {
+            partner.id: (partner.partner_latitude, partner.partner_longitude, partner.active, partner.company_id.id)
+            for partner in self.with_context(active_test=False)
+            if partner.is_company and partner.partner_latitude and partner.partner_longitude
+        }
+    
+    def _bump_gps_customer_index(self):
+        """Invalidate the cached gps.tracking customer index in every worker"""
+        cr = self.env.cr
+        cr.execute("SELECT nextval('gps_customer_index_version_seq')")
+        # Bump again once the change is committed or discarded: another transaction may have
+        # rebuilt the index under the new version before it could see the change
+        if not cr.postcommit.data.get('gps_customer_index_bump'):
+            cr.postcommit.data['gps_customer_index_bump'] = True
+            registry = self.env.registry
+            
+            def bump():
+                with registry.cursor() as new_cr:
+                    new_cr.execute("SELECT nextval('gps_customer_index_version_seq')")
+            cr.postcommit.add(bump)
+            cr.postrollback.add(bump)
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        partners = super(ResPartner, self).create(vals_list)
+        if any(vals.get('partner_latitude') or vals.get('partner_longitude') for vals in vals_list):
+            if partners._get_gps_index_state():
+                partners._bump_gps_customer_index()
+        return partners
+    
+    def write(self, vals):
+        if not self._GPS_INDEX_FIELDS.intersection(vals):
+            return super(ResPartner, self).write(vals)
+        state_before = self._get_gps_index_state()
+        res = super(ResPartner, self).write(vals)
+        if self._get_gps_index_state() != state_before:
+            self._bump_gps_customer_index()
+        return res
+    
+    def unlink(self):
+        indexed = bool(self._get_gps_index_state())
+        res = super(ResPartner, self).unlink()
+        if indexed:
+            self._bump_gps_customer_index()
+        return res
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api, tools
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from odoo import models, fields, api, tools, _
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 
@@ -99,16 +102,26 @@ class IncentiveProgram(models.Model):
     reward_tier_ids = fields.One2many('incentive.reward.tier', 'program_id', string='Reward Tiers')
     achievement_ids = fields.One2many('sales.rep.achievement', 'program_id', string='Achievements')
     
-    @api.depends('achievement_ids')
+    @api.depends('achievement_ids.sales_rep_id', 'achievement_ids.reward_amount', 'achievement_ids.is_achieved')
     def _compute_statistics(self):
+        Achievement = self.env['sales.rep.achievement']
+        domain = [('program_id', 'in', self._origin.ids)]
+        achievement_data = Achievement.read_group(
+            domain, ['sales_rep_id:count_distinct', 'reward_amount:sum'], ['program_id'], lazy=False)
+        achieved_data = Achievement.read_group(
+            domain + [('is_achieved', '=', True)], ['program_id'], ['program_id'], lazy=False)
+        
+        stats = {data['program_id'][0]: data for data in achievement_data}
+        achieved_counts = {data['program_id'][0]: data['__count'] for data in achieved_data}
+        
         for program in self:
-            achievements = program.achievement_ids
-            program.participant_count = len(achievements.mapped('sales_rep_id'))
-            program.total_rewards_paid = sum(achievements.mapped('reward_amount'))
+            data = stats.get(program._origin.id)
+            program.participant_count = data['sales_rep_id'] if data else 0
+            program.total_rewards_paid = data['reward_amount'] if data else 0.0
             
-            if achievements:
-                achieved_count = len(achievements.filtered('is_achieved'))
-                program.achievement_rate = (achieved_count / len(achievements)) * 100
+            if data:
+                achieved_count = achieved_counts.get(program._origin.id, 0)
+                program.achievement_rate = (achieved_count / data['__count']) * 100
             else:
                 program.achievement_rate = 0.0
     
@@ -161,16 +174,17 @@ class IncentiveProgram(models.Model):
     
     def _create_achievements(self):
         """Create achievement records for eligible sales reps"""
-        eligible_reps = self._get_eligible_sales_reps()
-        for rep in eligible_reps:
-            self.env['sales.rep.achievement'].create({
-                'program_id': self.id,
+        vals_list = []
+        for program in self:
+            vals_list += [{
+                'program_id': program.id,
                 'sales_rep_id': rep.id,
-                'target_amount': self.target_amount,
-                'target_quantity': self.target_quantity,
-                'period_start': self.start_date,
-                'period_end': self.end_date,
-            })
+                'target_amount': program.target_amount,
+                'target_quantity': program.target_quantity,
+                'period_start': program.start_date,
+                'period_end': program.end_date,
+            } for rep in program._get_eligible_sales_reps()]
+        self.env['sales.rep.achievement'].create(vals_list)
     
     def _get_eligible_sales_reps(self):
         """Get sales reps eligible for this program"""
@@ -188,10 +202,29 @@ class IncentiveProgram(models.Model):
         
         return self.env['sales.representative'].search(domain)
     
+    def _get_tier_table(self):
+        """Return the reward tiers resolved into non-overlapping achievement bands
+        
+        A percentage gets the first tier, by ascending minimum, whose minimum is
+        reached and whose maximum (if any) is not exceeded. That choice only changes
+        at tier minimums and maximums, so it is resolved once per band here.
+        
+        :return: ``(bounds, points, gaps)`` where ``bounds`` is the sorted tuple of
+                 distinct tier minimums and maximums, ``points[i]`` the tier selected
+                 at exactly ``bounds[i]`` and ``gaps[i]`` the tier selected strictly
+                 between ``bounds[i - 1]`` and ``bounds[i]`` (``gaps[-1]`` above the
+                 last bound); tiers are ``(reward_amount, reward_percentage,
+                 bonus_points, description)`` tuples or None
+        """
+        self.ensure_one()
+        return self.env['incentive.reward.tier']._get_tier_table(self.id)
+    
     def _calculate_final_rewards(self):
         """Calculate final rewards for all achievements"""
-        for achievement in self.achievement_ids:
-            achievement._calculate_reward()
+        # Skip per-achievement tracking messages, post one summary per program instead
+        self.achievement_ids.with_context(tracking_disable=True, mail_notrack=True)._calculate_reward()
+        for program in self:
+            program.message_post(body=_("Final rewards calculated for %s achievements.") % len(program.achievement_ids))
 
 
 class IncentiveRewardTier(models.Model):
@@ -207,6 +240,46 @@ class IncentiveRewardTier(models.Model):
     reward_percentage = fields.Float('Reward Percentage')
     bonus_points = fields.Integer('Bonus Points')
     description = fields.Text('Description')
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return records
+    
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+    
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+    
+    @api.model
+    @tools.ormcache('program_id')
+    def _get_tier_table(self, program_id):
+        """Cached ``(bounds, points, gaps)`` bands of a program, see ``incentive.program._get_tier_table``"""
+        tiers = [(tier.min_achievement, tier.max_achievement, tier.reward_amount,
+                  tier.reward_percentage, tier.bonus_points, tier.description)
+                 for tier in self.sudo().search([('program_id', '=', program_id)], order='min_achievement, id')]
+        
+        def select(percentage):
+            for min_achievement, max_achievement, *reward in tiers:
+                if min_achievement <= percentage and (not max_achievement or percentage <= max_achievement):
+                    return tuple(reward)
+            return None
+        
+        bounds = tuple(sorted({tier[0] for tier in tiers} | {tier[1] for tier in tiers if tier[1]}))
+        points = tuple(select(bound) for bound in bounds)
+        # A sample point inside each gap decides the tier of the whole gap
+        samples = [bounds[0] - 1] if bounds else [0.0]
+        samples += [(low + high) / 2 for low, high in zip(bounds, bounds[1:])]
+        if bounds:
+            samples.append(bounds[-1] + 1)
+        gaps = tuple(select(sample) for sample in samples)
+        return bounds, points, gaps
 
 
 class SalesRepAchievement(models.Model):
@@ -255,130 +328,232 @@ class SalesRepAchievement(models.Model):
     achievement_date = fields.Date('Achievement Date')
     reward_date = fields.Date('Reward Date')
     
-    @api.model
-    def create(self, vals):
-        if vals.get('name', 'New') == 'New':
-            vals['name'] = self.env['ir.sequence'].next_by_code('sales.rep.achievement') or 'New'
-        return super().create(vals)
-    
-    @api.depends('sales_rep_id', 'period_start', 'period_end', 'program_id')
+    def init(self):
+        # Partial indexes matching the filters of the actual performance computes
+        tools.create_index(self.env.cr, 'sale_order_user_date_state_idx', 'sale_order',
+                           ['user_id', 'date_order'], where="state IN ('sale', 'done')")
+        tools.create_index(self.env.cr, 'training_enrollment_rep_completion_idx', 'training_enrollment',
+                           ['sales_rep_id', 'completion_date'], where="status = 'completed' AND passed = true")
+        tools.create_index(self.env.cr, 'res_partner_company_customer_create_idx', 'res_partner',
+                           ['create_date'], where="is_company = true AND customer_rank > 0")
+        # Program statistics aggregate these columns per program: allow index-only scans
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS sales_rep_achievement_program_stats_idx
+            ON sales_rep_achievement (program_id) INCLUDE (is_achieved, reward_amount, sales_rep_id)
+        """)
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        vals_to_name = [vals for vals in vals_list if vals.get('name', 'New') == 'New']
+        if vals_to_name:
+            names = self.env['ir.sequence']._next_by_code_batch('sales.rep.achievement', len(vals_to_name))
+            for vals, name in zip(vals_to_name, names):
+                vals['name'] = name or 'New'
+        return super().create(vals_list)
+    
+    # No @api.depends: actuals follow sale orders, customers and enrollments, which are
+    # not tracked by the ORM. They are computed on creation and refreshed by cron.
     def _compute_actual_performance(self):
+        self.update({
+            'actual_amount': 0.0,
+            'actual_quantity': 0,
+            'actual_percentage': 0.0,
+        })
+        achievements = self.filtered(lambda a: a.sales_rep_id and a.period_start and a.period_end)
+        # Warm the cache for the relations read below, one query per relation
+        achievements.program_id.mapped('program_type')
+        achievements.sales_rep_id.mapped('user_id')
+        
+        # Calculate based on program type, one batch per type
+        ids_by_type = defaultdict(list)
+        for achievement in achievements:
+            ids_by_type[achievement.program_id.program_type].append(achievement.id)
+        
+        self.browse(ids_by_type['sales_target'])._compute_sales_performance()
+        self.browse(ids_by_type['customer_acquisition'])._compute_customer_acquisition()
+        self.browse(ids_by_type['training_completion'])._compute_training_completion()
+    
+    @api.model
+    def _cron_refresh_actuals(self):
+        """Recompute the actual performance of achievements still in progress"""
+        achievements = self.search([('state', 'in', ['draft', 'in_progress'])])
+        for fname in ('actual_amount', 'actual_quantity', 'actual_percentage'):
+            self.env.add_to_compute(self._fields[fname], achievements)
+        achievements.flush_recordset()
+    
+    def _group_by_period(self):
+        """Group achievements by their (period_start, period_end) window"""
+        ids_by_period = defaultdict(list)
         for achievement in self:
-            if not achievement.sales_rep_id or not achievement.period_start or not achievement.period_end:
-                achievement.actual_amount = 0.0
-                achievement.actual_quantity = 0
-                achievement.actual_percentage = 0.0
-                continue
-            
-            # Calculate based on program type
-            if achievement.program_id.program_type == 'sales_target':
-                achievement._compute_sales_performance()
-            elif achievement.program_id.program_type == 'customer_acquisition':
-                achievement._compute_customer_acquisition()
-            elif achievement.program_id.program_type == 'training_completion':
-                achievement._compute_training_completion()
-            else:
-                achievement.actual_amount = 0.0
-                achievement.actual_quantity = 0
-                achievement.actual_percentage = 0.0
+            ids_by_period[(achievement.period_start, achievement.period_end)].append(achievement.id)
+        return {period: self.browse(ids) for period, ids in ids_by_period.items()}
     
     def _compute_sales_performance(self):
         """Compute sales performance for sales target programs"""
-        # Get sales orders in the period
-        orders = self.env['sale.order'].search([
-            ('user_id', '=', self.sales_rep_id.user_id.id),
-            ('date_order', '>=', self.period_start),
-            ('date_order', '<=', self.period_end),
-            ('state', 'in', ['sale', 'done'])
-        ])
+        # Group achievements sharing the same salesperson and period
+        ids_by_key = defaultdict(list)
+        for achievement in self:
+            key = (achievement.sales_rep_id.user_id.id, achievement.period_start, achievement.period_end)
+            ids_by_key[key].append(achievement.id)
+        user_ids = list({user_id for user_id, _start, _end in ids_by_key if user_id})
+        if not user_ids:
+            return
+        
+        # Get confirmed daily sales of all salespersons over all periods at once
+        rows = self.env['sale.order.rep.daily'].search_read([
+            ('user_id', 'in', user_ids),
+            ('date', '>=', min(start for _user, start, _end in ids_by_key)),
+            ('date', '<=', max(end for _user, _start, end in ids_by_key)),
+        ], ['user_id', 'date', 'total_amount', 'order_count'], order='user_id, date')
         
-        self.actual_amount = sum(orders.mapped('amount_total'))
-        self.actual_quantity = len(orders)
+        # Per salesperson: sorted days and running totals, so any period is two bisects
+        dates, amounts, counts = defaultdict(list), defaultdict(lambda: [0.0]), defaultdict(lambda: [0])
+        for row in rows:
+            user_id = row['user_id'][0]
+            dates[user_id].append(row['date'])
+            amounts[user_id].append(amounts[user_id][-1] + row['total_amount'])
+            counts[user_id].append(counts[user_id][-1] + row['order_count'])
+        
+        for (user_id, period_start, period_end), ids in ids_by_key.items():
+            if user_id not in dates:
+                continue
+            start = bisect_left(dates[user_id], period_start)
+            end = bisect_right(dates[user_id], period_end)
+            self.browse(ids).update({
+                'actual_amount': amounts[user_id][end] - amounts[user_id][start],
+                'actual_quantity': counts[user_id][end] - counts[user_id][start],
+            })
     
     def _compute_customer_acquisition(self):
         """Compute customer acquisition performance"""
-        # Get new customers acquired in the period
-        customers = self.env['res.partner'].search([
-            ('create_date', '>=', self.period_start),
-            ('create_date', '<=', self.period_end),
-            ('is_company', '=', True),
-            ('customer_rank', '>', 0)
-        ])
-        
-        # Filter by sales rep's territory or assignments
-        if self.sales_rep_id.territory_id:
-            customers = customers.filtered(lambda c: c.state_id in self.sales_rep_id.territory_id.state_ids)
-        
-        self.actual_quantity = len(customers)
+        for (period_start, period_end), achievements in self._group_by_period().items():
+            # Get new customers acquired in the period
+            domain = [
+                ('create_date', '>=', period_start),
+                ('create_date', '<=', period_end),
+                ('is_company', '=', True),
+                ('customer_rank', '>', 0)
+            ]
+            
+            # Filter by sales rep's territory or assignments
+            achievements.sales_rep_id.territory_id.mapped('state_ids')
+            with_territory = achievements.filtered(lambda a: a.sales_rep_id.territory_id)
+            if with_territory:
+                # Only count the states covered by the territories in the batch
+                state_ids = with_territory.sales_rep_id.territory_id.state_ids.ids
+                customer_data = self.env['res.partner'].read_group(
+                    domain + [('state_id', 'in', state_ids)], ['state_id'], ['state_id'], lazy=False)
+                state_counts = {data['state_id'][0]: data['__count'] for data in customer_data}
+                for achievement in with_territory:
+                    territory = achievement.sales_rep_id.territory_id
+                    achievement.actual_quantity = sum(state_counts.get(state_id, 0)
+                                                      for state_id in territory.state_ids.ids)
+            
+            without_territory = achievements - with_territory
+            if without_territory:
+                without_territory.actual_quantity = self.env['res.partner'].search_count(domain)
     
     def _compute_training_completion(self):
         """Compute training completion performance"""
-        enrollments = self.env['training.enrollment'].search([
-            ('sales_rep_id', '=', self.sales_rep_id.id),
-            ('completion_date', '>=', self.period_start),
-            ('completion_date', '<=', self.period_end),
-            ('status', '=', 'completed'),
-            ('passed', '=', True)
-        ])
-        
-        self.actual_quantity = len(enrollments)
-        if enrollments:
-            self.actual_percentage = sum(enrollments.mapped('final_score')) / len(enrollments)
+        for (period_start, period_end), achievements in self._group_by_period().items():
+            enrollment_data = self.env['training.enrollment'].read_group([
+                ('sales_rep_id', 'in', achievements.sales_rep_id.ids),
+                ('completion_date', '>=', period_start),
+                ('completion_date', '<=', period_end),
+                ('status', '=', 'completed'),
+                ('passed', '=', True)
+            ], ['final_score:avg'], ['sales_rep_id'], lazy=False)
+            scores = {data['sales_rep_id'][0]: (data['final_score'], data['__count'])
+                      for data in enrollment_data}
+            
+            for achievement in achievements:
+                rep_id = achievement.sales_rep_id.id
+                score, count = scores.get(rep_id, (0.0, 0))
+                achievement.actual_quantity = count
+                achievement.actual_percentage = score
     
     @api.depends('target_amount', 'target_quantity', 'target_percentage', 'actual_amount', 'actual_quantity', 'actual_percentage')
     def _compute_achievement(self):
         for achievement in self:
-            if achievement.target_amount > 0:
-                achievement.achievement_percentage = (achievement.actual_amount / achievement.target_amount) * 100
-            elif achievement.target_quantity > 0:
-                achievement.achievement_percentage = (achievement.actual_quantity / achievement.target_quantity) * 100
-            elif achievement.target_percentage > 0:
-                achievement.achievement_percentage = (achievement.actual_percentage / achievement.target_percentage) * 100
+            target_amount = achievement.target_amount
+            target_quantity = achievement.target_quantity
+            target_percentage = achievement.target_percentage
+            if target_amount > 0:
+                percentage = (achievement.actual_amount / target_amount) * 100
+            elif target_quantity > 0:
+                percentage = (achievement.actual_quantity / target_quantity) * 100
+            elif target_percentage > 0:
+                percentage = (achievement.actual_percentage / target_percentage) * 100
             else:
-                achievement.achievement_percentage = 0.0
+                percentage = 0.0
             
-            achievement.is_achieved = achievement.achievement_percentage >= 100.0
+            achievement.update({
+                'achievement_percentage': percentage,
+                'is_achieved': percentage >= 100.0,
+            })
     
     def _calculate_reward(self):
-        """Calculate reward based on achievement and program configuration"""
+        """Calculate reward based on achievement and program configuration
+        
+        Achievements sharing the same reward values are written together.
+        """
+        ids_by_values = defaultdict(list)
+        for achievement in self:
+            values = achievement._get_reward_values()
+            ids_by_values[tuple(sorted(values.items()))].append(achievement.id)
+        
+        for values, ids in ids_by_values.items():
+            if values:
+                self.browse(ids).write(dict(values))
+    
+    def _get_reward_values(self):
+        """Return the reward values to write on this achievement"""
+        self.ensure_one()
         if not self.is_achieved:
-            self.reward_amount = 0.0
-            self.reward_points = 0
-            return
+            return {'reward_amount': 0.0, 'reward_points': 0}
         
         program = self.program_id
+        values = {}
         
         if program.calculation_method == 'fixed_amount':
-            self.reward_amount = program.base_reward_amount
+            values['reward_amount'] = program.base_reward_amount
         elif program.calculation_method == 'percentage':
             base_amount = self.actual_amount if program.program_type == 'sales_target' else program.base_reward_amount
-            self.reward_amount = base_amount * (program.base_reward_amount / 100)
+            values['reward_amount'] = base_amount * (program.base_reward_amount / 100)
         elif program.calculation_method == 'tiered':
-            self._calculate_tiered_reward()
+            values = self._get_tiered_reward_values()
         elif program.calculation_method == 'points_based':
-            self.reward_points = int(self.achievement_percentage * 10)
+            values['reward_points'] = int(self.achievement_percentage * 10)
         
         # Apply maximum limit
-        if program.max_reward_amount > 0 and self.reward_amount > program.max_reward_amount:
-            self.reward_amount = program.max_reward_amount
-    
-    def _calculate_tiered_reward(self):
-        """Calculate reward based on tier configuration"""
-        tiers = self.program_id.reward_tier_ids.sorted('min_achievement')
+        if program.max_reward_amount > 0 and values.get('reward_amount', self.reward_amount) > program.max_reward_amount:
+            values['reward_amount'] = program.max_reward_amount
+        return values
+    
+    def _get_tiered_reward_values(self):
+        """Return the reward values based on tier configuration"""
+        bounds, points, gaps = self.program_id._get_tier_table()
+        percentage = self.achievement_percentage
+        values = {}
+        
+        # Locate the percentage among the band bounds: either exactly on one, or in a gap
+        index = bisect_left(bounds, percentage)
+        if index < len(bounds) and bounds[index] == percentage:
+            tier = points[index]
+        else:
+            tier = gaps[index]
         
-        for tier in tiers:
-            if (tier.min_achievement <= self.achievement_percentage and 
-                (not tier.max_achievement or self.achievement_percentage <= tier.max_achievement)):
-                
-                if tier.reward_amount > 0:
-                    self.reward_amount = tier.reward_amount
-                elif tier.reward_percentage > 0:
-                    base_amount = self.actual_amount if self.program_id.program_type == 'sales_target' else self.program_id.base_reward_amount
-                    self.reward_amount = base_amount * (tier.reward_percentage / 100)
-                
-                self.reward_points = tier.bonus_points
-                self.reward_description = tier.description
-                break
+        if tier:
+            reward_amount, reward_percentage, bonus_points, description = tier
+            if reward_amount > 0:
+                values['reward_amount'] = reward_amount
+            elif reward_percentage > 0:
+                base_amount = self.actual_amount if self.program_id.program_type == 'sales_target' else self.program_id.base_reward_amount
+                values['reward_amount'] = base_amount * (reward_percentage / 100)
+            
+            values['reward_points'] = bonus_points
+            values['reward_description'] = description
+        return values
     
     def action_mark_rewarded(self):
         """Mark achievement as rewarded"""
@@ -394,7 +569,7 @@ class SalesRepReward(models.Model):
     
     name = fields.Char('Reference', required=True, copy=False, readonly=True, default=lambda self: 'New')
     sales_rep_id = fields.Many2one('sales.rep', string='Sales Representative', required=True, tracking=True)
-    achievement_id = fields.Many2one('sales.rep.achievement', string='Achievement', tracking=True)
+    achievement_id = fields.Many2one('sales.rep.achievement', string='Achievement', tracking=True, index=True)
     program_id = fields.Many2one('incentive.program', string='Program', related='achievement_id.program_id', store=True)
     
     # Reward Details
@@ -434,11 +609,14 @@ class SalesRepReward(models.Model):
     payment_date = fields.Date('Payment Date')
     payment_reference = fields.Char('Payment Reference')
     
-    @api.model
-    def create(self, vals):
-        if vals.get('name', 'New') == 'New':
-            vals['name'] = self.env['ir.sequence'].next_by_code('sales.rep.reward') or 'New'
-        return super().create(vals)
+    @api.model_create_multi
+    def create(self, vals_list):
+        vals_to_name = [vals for vals in vals_list if vals.get('name', 'New') == 'New']
+        if vals_to_name:
+            names = self.env['ir.sequence']._next_by_code_batch('sales.rep.reward', len(vals_to_name))
+            for vals, name in zip(vals_to_name, names):
+                vals['name'] = name or 'New'
+        return super().create(vals_list)
     
     def action_approve(self):
         self.state = 'approved'
@@ -451,6 +629,36 @@ class SalesRepReward(models.Model):
         self.state = 'cancelled'
 
 
+class SaleOrderRepDaily(models.Model):
+    _name = 'sale.order.rep.daily'
+    _description = 'Daily Confirmed Sales per Salesperson'
+    _auto = False
+    _rec_name = 'date'
+    
+    user_id = fields.Many2one('res.users', string='Salesperson', readonly=True)
+    date = fields.Date('Date', readonly=True)
+    total_amount = fields.Float('Total Amount', readonly=True)
+    order_count = fields.Integer('Orders', readonly=True)
+    
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""
+            CREATE OR REPLACE VIEW %s AS (
+                SELECT
+                    MIN(so.id) AS id,
+                    so.user_id,
+                    DATE(so.date_order) AS date,
+                    SUM(so.amount_total) AS total_amount,
+                    COUNT(*) AS order_count
+                FROM sale_order so
+                WHERE so.state IN ('sale', 'done')
+                GROUP BY
+                    so.user_id,
+                    DATE(so.date_order)
+            )
+        """ % self._table)
+
+
 class IncentiveAnalytics(models.Model):
     _name = 'incentive.analytics'
     _description = 'Incentive Analytics'
@@ -477,29 +685,63 @@ class IncentiveAnalytics(models.Model):
     def init(self):
         tools.drop_view_if_exists(self.env.cr, self._table)
         self.env.cr.execute("""
-            CREATE OR REPLACE VIEW %s AS (
+            CREATE MATERIALIZED VIEW %s AS (
+                WITH g AS (
+                    SELECT
+                        DATE(a.period_start) AS date,
+                        a.sales_rep_id,
+                        a.program_id,
+                        ta.geo_node_id AS territory_id,
+                        COUNT(a.id) AS achievement_count,
+                        COALESCE(SUM(r.rc), 0) AS reward_count,
+                        COALESCE(SUM(r.ra), 0) AS total_reward_amount,
+                        COALESCE(SUM(r.rp), 0) AS total_reward_points,
+                        AVG(a.achievement_percentage) AS ap,
+                        AVG(a.target_amount) AS target_amount,
+                        AVG(a.actual_amount) AS actual_amount
+                    FROM sales_rep_achievement a
+                    LEFT JOIN sales_rep sr ON a.sales_rep_id = sr.id
+                    LEFT JOIN territory_assignment ta ON sr.id = ta.sales_rep_id AND ta.active = true
+                    LEFT JOIN (
+                        SELECT
+                            achievement_id,
+                            SUM(reward_amount) AS ra,
+                            SUM(reward_points) AS rp,
+                            COUNT(*) AS rc
+                        FROM sales_rep_reward
+                        GROUP BY achievement_id
+                    ) r ON r.achievement_id = a.id
+                    GROUP BY
+                        DATE(a.period_start),
+                        a.sales_rep_id,
+                        a.program_id,
+                        ta.geo_node_id
+                )
                 SELECT
                     ROW_NUMBER() OVER () AS id,
-                    DATE(a.period_start) AS date,
-                    a.sales_rep_id,
-                    a.program_id,
-                    ta.geo_node_id AS territory_id,
-                    COUNT(a.id) AS achievement_count,
-                    COUNT(r.id) AS reward_count,
-                    COALESCE(SUM(r.reward_amount), 0) AS total_reward_amount,
-                    COALESCE(SUM(r.reward_points), 0) AS total_reward_points,
-                    AVG(a.achievement_percentage) AS average_achievement_rate,
-                    AVG(a.target_amount) AS target_amount,
-                    AVG(a.actual_amount) AS actual_amount,
-                    AVG(a.achievement_percentage) AS achievement_percentage
-                FROM sales_rep_achievement a
-                LEFT JOIN sales_rep sr ON a.sales_rep_id = sr.id
-                LEFT JOIN territory_assignment ta ON sr.id = ta.sales_rep_id AND ta.active = true
-                LEFT JOIN sales_rep_reward r ON a.id = r.achievement_id
-                GROUP BY
-                    DATE(a.period_start),
-                    a.sales_rep_id,
-                    a.program_id,
-                    ta.geo_node_id
+                    date,
+                    sales_rep_id,
+                    program_id,
+                    territory_id,
+                    achievement_count,
+                    reward_count,
+                    total_reward_amount,
+                    total_reward_points,
+                    ap AS average_achievement_rate,
+                    target_amount,
+                    actual_amount,
+                    ap AS achievement_percentage
+                FROM g
             )
-        """ % self._table)
\ No newline at end of file
+        """ % self._table)
+        # Unique index required by REFRESH ... CONCURRENTLY, plus the usual report filters
+        self.env.cr.execute("CREATE UNIQUE INDEX %s_id_idx ON %s (id)" % (self._table, self._table))
+        self.env.cr.execute("CREATE INDEX %s_rep_date_idx ON %s (sales_rep_id, date)" % (self._table, self._table))
+        self.env.cr.execute("CREATE INDEX %s_program_date_idx ON %s (program_id, date)" % (self._table, self._table))
+    
+    @api.model
+    def _cron_refresh(self):
+        """Refresh the materialized analytics without blocking readers"""
+        self.env.flush_all()
+        self.env.cr.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY %s" % self._table)
+        self.invalidate_model()
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class IrSequence(models.Model):
+    _inherit = 'ir.sequence'
+    
+    @api.model
+    def _next_by_code_batch(self, sequence_code, count):
+        """Reserve ``count`` references from the sequence ``sequence_code`` at once
+        
+        Same sequence lookup as ``next_by_code``; returns a list of ``count``
+        references, all ``False`` when no sequence is found.
+        """
+        sequence = self.sudo().search([
+            ('code', '=', sequence_code),
+            ('company_id', 'in', [self.env.company.id, False])
+        ], order='company_id', limit=1)
+        if not sequence:
+            return [False] * count
+        if sequence.implementation != 'standard' or sequence.use_date_range:
+            return [sequence._next() for _i in range(count)]
+        # Standard sequences are backed by a PostgreSQL sequence: fetch the whole block in one query
+        self.env.cr.execute("SELECT nextval(%s) FROM generate_series(1, %s)",
+                            ('ir_sequence_%03d' % sequence.id, count))
+        return [sequence.get_next_char(number) for number, in self.env.cr.fetchall()]
@@ -2,6 +2,7 @@
 from odoo import models, fields, api, tools, _
 from odoo.exceptions import UserError, ValidationError
 from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -28,16 +29,29 @@ class LeadSource(models.Model):
     ]
     
     def _compute_lead_count(self):
+        lead_data = self.env['sales.lead'].read_group(
+            [('source_id', 'in', self.ids)],
+            ['source_id'], ['source_id'])
+        lead_dict = {data['source_id'][0]: data['source_id_count'] for data in lead_data}
         for source in self:
-            source.lead_count = self.env['sales.lead'].search_count([('source_id', '=', source.id)])
+            source.lead_count = lead_dict.get(source.id, 0)
     
     def _compute_conversion_rate(self):
+        # Total and converted leads in one pass: count per (source, stage), won stages summed apart
+        lead_data = self.env['sales.lead'].read_group(
+            [('source_id', 'in', self.ids)],
+            ['source_id'], ['source_id', 'stage_id'], lazy=False)
+        won_stage_ids = set(self.env['lead.stage'].with_context(active_test=False).search([('is_won', '=', True)]).ids)
+        total_dict, converted_dict = {}, {}
+        for data in lead_data:
+            source_id = data['source_id'][0]
+            total_dict[source_id] = total_dict.get(source_id, 0) + data['__count']
+            if data['stage_id'] and data['stage_id'][0] in won_stage_ids:
+                converted_dict[source_id] = converted_dict.get(source_id, 0) + data['__count']
+        
         for source in self:
-            total_leads = self.env['sales.lead'].search_count([('source_id', '=', source.id)])
-            converted_leads = self.env['sales.lead'].search_count([
-                ('source_id', '=', source.id),
-                ('stage_id.is_won', '=', True)
-            ])
+            total_leads = total_dict.get(source.id, 0)
+            converted_leads = converted_dict.get(source.id, 0)
             source.conversion_rate = (converted_leads / total_leads * 100) if total_leads > 0 else 0.0
     
     def action_view_leads(self):
@@ -86,8 +100,52 @@ class LeadStage(models.Model):
     lead_count = fields.Integer('Lead Count', compute='_compute_lead_count')
     
     def _compute_lead_count(self):
+        lead_data = self.env['sales.lead'].read_group(
+            [('stage_id', 'in', self.ids)],
+            ['stage_id'], ['stage_id'])
+        lead_dict = {data['stage_id'][0]: data['stage_id_count'] for data in lead_data}
         for stage in self:
-            stage.lead_count = self.env['sales.lead'].search_count([('stage_id', '=', stage.id)])
+            stage.lead_count = lead_dict.get(stage.id, 0)
+    
+    _STAGE_DOMAINS = {
+        'won': [('is_won', '=', True)],
+        'lost': [('is_lost', '=', True)],
+        'qualified': [('name', 'ilike', 'qualified')],
+    }
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return records
+    
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+    
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+    
+    @api.model
+    @tools.ormcache('kind')
+    def _get_stage_id(self, kind):
+        """Return the id of the first 'won', 'lost' or 'qualified' stage, or False"""
+        return self.sudo().search(self._STAGE_DOMAINS[kind], limit=1).id
+    
+    @api.model
+    def _get_stage(self, kind):
+        return self.browse(self._get_stage_id(kind))
+    
+    @api.model
+    @tools.ormcache()
+    def _get_stage_flags(self):
+        """Return ``{stage_id: (is_won, is_lost, auto_assign_sales_rep, send_email_notification)}``"""
+        stages = self.sudo().with_context(active_test=False).search([])
+        return {stage.id: (stage.is_won, stage.is_lost, stage.auto_assign_sales_rep, stage.send_email_notification)
+                for stage in stages}
     
     def action_view_stage_leads(self):
         """View leads in this stage"""
@@ -129,9 +187,9 @@ class SalesLead(models.Model):
     zip = fields.Char('ZIP')
     
     # Lead Details
-    source_id = fields.Many2one('lead.source', string='Lead Source', required=True, tracking=True)
-    stage_id = fields.Many2one('lead.stage', string='Stage', required=True, tracking=True, group_expand='_read_group_stage_ids')
-    sales_rep_id = fields.Many2one('sales.rep', string='Assigned Sales Rep', tracking=True)
+    source_id = fields.Many2one('lead.source', string='Lead Source', required=True, tracking=True, index=True)
+    stage_id = fields.Many2one('lead.stage', string='Stage', required=True, tracking=True, index=True, group_expand='_read_group_stage_ids')
+    sales_rep_id = fields.Many2one('sales.rep', string='Assigned Sales Rep', tracking=True, index=True)
     territory_id = fields.Many2one('territory.assignment', string='Territory', compute='_compute_territory_id', store=True)
     
     # Qualification
@@ -148,7 +206,7 @@ class SalesLead(models.Model):
     probability = fields.Float('Success Probability (%)', default=10.0, tracking=True)
     
     # Timeline
-    date_created = fields.Datetime('Created Date', default=fields.Datetime.now, readonly=True)
+    date_created = fields.Datetime('Created Date', default=fields.Datetime.now, readonly=True, index=True)
     date_assigned = fields.Datetime('Assigned Date', readonly=True)
     expected_closing = fields.Date('Expected Closing Date', tracking=True)
     date_converted = fields.Datetime('Converted Date', readonly=True)
@@ -156,7 +214,8 @@ class SalesLead(models.Model):
     
     # Status
     active = fields.Boolean('Active', default=True)
-    is_qualified = fields.Boolean('Is Qualified', compute='_compute_is_qualified', store=True)
+    # Filled by PostgreSQL as a generated column (qualification_score >= 60), see init()
+    is_qualified = fields.Boolean('Is Qualified', readonly=True, copy=False, index=True)
     
     # Conversion
     partner_id = fields.Many2one('res.partner', string='Converted Customer', readonly=True)
@@ -176,23 +235,41 @@ class SalesLead(models.Model):
     company_id = fields.Many2one('res.company', string='Company', default=lambda self: self.env.company)
     currency_id = fields.Many2one('res.currency', string='Currency', related='company_id.currency_id')
     
+    def init(self):
+        # lead.analytics groups leads by creation day
+        tools.create_index(self.env.cr, 'sales_lead_date_created_day_idx',
+                           self._table, ['(DATE(date_created))'])
+        
+        # Let PostgreSQL maintain is_qualified instead of recomputing it in Python
+        self.env.cr.execute("""
+            SELECT is_generated FROM information_schema.columns
+            WHERE table_name = %s AND column_name = 'is_qualified'
+        """, (self._table,))
+        row = self.env.cr.fetchone()
+        if row and row[0] == 'ALWAYS':
+            return
+        # lead_analytics reads the column, it is recreated by its own init()
+        tools.drop_view_if_exists(self.env.cr, 'lead_analytics')
+        self.env.cr.execute("""
+            ALTER TABLE %s DROP COLUMN IF EXISTS is_qualified;
+            ALTER TABLE %s ADD COLUMN is_qualified boolean
+                GENERATED ALWAYS AS (qualification_score >= 60) STORED;
+        """ % (self._table, self._table))
+    
     @api.model
     def _read_group_stage_ids(self, stages, domain, order):
         """Read group customization for stage_id field"""
         stage_ids = self.env['lead.stage'].search([])
         return stage_ids
     
-    @api.depends('qualification_score')
-    def _compute_is_qualified(self):
-        for lead in self:
-            lead.is_qualified = lead.qualification_score >= 60  # 60% threshold for qualification
-    
     @api.depends('sales_rep_id')
     def _compute_territory_id(self):
+        # Fetch the assignments of all the reps involved in one query
+        self.sales_rep_id.mapped('territory_assignment_ids.active')
         for lead in self:
             if lead.sales_rep_id and lead.sales_rep_id.territory_assignment_ids:
                 # Get the first active territory assignment
-                territory = lead.sales_rep_id.territory_assignment_ids.filtered(lambda t: t.active)[:1]
+                territory = lead.sales_rep_id.territory_assignment_ids.filtered_domain([('active', '=', True)])[:1]
                 lead.territory_id = territory.id if territory else False
             else:
                 lead.territory_id = False
@@ -200,61 +277,86 @@ class SalesLead(models.Model):
     @api.onchange('stage_id')
     def _onchange_stage_id(self):
         if self.stage_id:
-            if self.stage_id.is_won:
+            is_won, is_lost, _auto_assign, _notify = self._stage_flags(self.stage_id)
+            if is_won:
                 self.probability = 100.0
-            elif self.stage_id.is_lost:
+            elif is_lost:
                 self.probability = 0.0
     
+    @api.onchange('qualification_score')
+    def _onchange_qualification_score(self):
+        # Mirror the generated column in the form until the record is saved
+        for lead in self:
+            lead.is_qualified = lead.qualification_score >= 60
+    
     @api.model
-    def create(self, vals):
-        lead = super().create(vals)
+    def _stage_flags(self, stage):
+        """Return the cached ``(is_won, is_lost, auto_assign_sales_rep, send_email_notification)`` of a stage"""
+        return self.env['lead.stage']._get_stage_flags().get(stage._origin.id, (False, False, False, False))
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        leads = super().create(vals_list)
+        leads.invalidate_recordset(['is_qualified'])
         
         # Auto-assign sales rep if stage requires it
-        if lead.stage_id.auto_assign_sales_rep and not lead.sales_rep_id:
-            lead._auto_assign_sales_rep()
+        leads.filtered(lambda l: self._stage_flags(l.stage_id)[2] and not l.sales_rep_id)._auto_assign_sales_rep()
         
         # Send notification if required
-        if lead.stage_id.send_email_notification:
-            lead._send_stage_notification()
+        leads.filtered(lambda l: self._stage_flags(l.stage_id)[3])._send_stage_notification()
         
-        return lead
+        return leads
     
     def write(self, vals):
-        old_stage = self.stage_id
+        # Handle sales rep assignment in the same UPDATE
+        if 'sales_rep_id' in vals and vals['sales_rep_id']:
+            vals = dict(vals, date_assigned=fields.Datetime.now())
+        
+        old_stages = {lead.id: lead.stage_id.id for lead in self} if 'stage_id' in vals else {}
         result = super().write(vals)
+        if 'qualification_score' in vals:
+            # The generated column changed in the database, drop the cached value
+            self.flush_recordset(['qualification_score'])
+            self.invalidate_recordset(['is_qualified'])
         
         # Handle stage changes
         if 'stage_id' in vals:
-            new_stage = self.env['lead.stage'].browse(vals['stage_id'])
-            self._handle_stage_change(old_stage, new_stage)
-        
-        # Handle sales rep assignment
-        if 'sales_rep_id' in vals and vals['sales_rep_id']:
-            self.write({'date_assigned': fields.Datetime.now()})
+            self._handle_stage_change(old_stages, self.env['lead.stage'].browse(vals['stage_id']))
         
         return result
     
-    def _handle_stage_change(self, old_stage, new_stage):
-        """Handle actions when stage changes"""
-        for lead in self:
-            # Auto-assign sales rep if required
-            if new_stage.auto_assign_sales_rep and not lead.sales_rep_id:
-                lead._auto_assign_sales_rep()
-            
-            # Send notification if required
-            if new_stage.send_email_notification:
-                lead._send_stage_notification()
-            
-            # Mark as converted if won stage
-            if new_stage.is_won and not lead.date_converted:
-                lead.date_converted = fields.Datetime.now()
-            
-            # Mark as lost if lost stage
-            if new_stage.is_lost and not lead.date_lost:
-                lead.date_lost = fields.Datetime.now()
+    def _handle_stage_change(self, old_stages, new_stage):
+        """Handle actions when stage changes
+        
+        :param old_stages: ``{lead_id: previous stage_id}`` captured before the write
+        :param new_stage: the ``lead.stage`` the leads moved to
+        """
+        # Only the leads that actually changed stage
+        moved = self.filtered(lambda l: old_stages.get(l.id) != new_stage.id)
+        if not moved:
+            return
+        now = fields.Datetime.now()
+        is_won, is_lost, auto_assign, notify = self._stage_flags(new_stage)
+        
+        # Auto-assign sales rep if required
+        if auto_assign:
+            moved.filtered(lambda l: not l.sales_rep_id)._auto_assign_sales_rep()
+        
+        # Send notification if required
+        if notify:
+            moved._send_stage_notification()
+        
+        # Mark as converted if won stage
+        if is_won:
+            moved.filtered(lambda l: not l.date_converted).write({'date_converted': now})
+        
+        # Mark as lost if lost stage
+        if is_lost:
+            moved.filtered(lambda l: not l.date_lost).write({'date_lost': now})
     
     def _auto_assign_sales_rep(self):
         """Auto-assign sales rep based on territory or workload"""
+        lead_counts = None
         for lead in self:
             # Try to find sales rep by territory first
             if lead.state_id:
@@ -268,31 +370,53 @@ class SalesLead(models.Model):
                     continue
             
             # If no territory match, assign to sales rep with least workload
-            sales_reps = self.env['sales.rep'].search([('active', '=', True)])
-            if sales_reps:
-                # Count current leads per sales rep
-                lead_counts = {}
-                for rep in sales_reps:
-                    lead_counts[rep.id] = self.search_count([
-                        ('sales_rep_id', '=', rep.id),
-                        ('stage_id.is_won', '=', False),
-                        ('stage_id.is_lost', '=', False)
-                    ])
-                
+            if lead_counts is None:
+                lead_counts = self._get_open_lead_counts()
+            if lead_counts:
                 # Assign to rep with minimum leads
                 min_rep_id = min(lead_counts, key=lead_counts.get)
                 lead.sales_rep_id = min_rep_id
+                # Keep the workload current for the next leads of the batch
+                if not lead.stage_id.is_won and not lead.stage_id.is_lost:
+                    lead_counts[min_rep_id] += 1
+    
+    @api.model
+    def _get_open_lead_counts(self):
+        """Return ``{sales_rep_id: open lead count}`` for all active sales reps"""
+        sales_reps = self.env['sales.rep'].search([('active', '=', True)])
+        lead_data = self.read_group([
+            ('sales_rep_id', 'in', sales_reps.ids),
+            ('stage_id.is_won', '=', False),
+            ('stage_id.is_lost', '=', False)
+        ], ['sales_rep_id'], ['sales_rep_id'])
+        lead_counts = dict.fromkeys(sales_reps.ids, 0)
+        lead_counts.update({data['sales_rep_id'][0]: data['sales_rep_id_count'] for data in lead_data})
+        return lead_counts
     
     def _send_stage_notification(self):
         """Send email notification for stage change"""
-        for lead in self:
-            if lead.sales_rep_id and lead.sales_rep_id.user_id:
-                lead.activity_schedule(
-                    'mail.mail_activity_data_todo',
-                    user_id=lead.sales_rep_id.user_id.id,
-                    summary=_('Lead Stage Changed'),
-                    note=_('Lead %s has moved to stage %s') % (lead.name, lead.stage_id.name)
-                )
+        leads = self.filtered(lambda l: l.sales_rep_id.user_id)
+        if not leads:
+            return self.env['mail.activity']
+        
+        # Same values as activity_schedule, created for all leads at once
+        activity_type = self.env.ref('mail.mail_activity_data_todo', raise_if_not_found=False) \
+            or self._default_activity_type()
+        model_id = self.env['ir.model']._get_id(self._name)
+        # Deadline from the activity type's configured delay, as activity_schedule does
+        date_deadline = fields.Date.context_today(self) + relativedelta(
+            **{activity_type.delay_unit or 'days': activity_type.delay_count})
+        activity_vals_list = [{
+            'activity_type_id': activity_type.id,
+            'automated': True,
+            'date_deadline': date_deadline,
+            'res_model_id': model_id,
+            'res_id': lead.id,
+            'user_id': lead.sales_rep_id.user_id.id,
+            'summary': _('Lead Stage Changed'),
+            'note': _('Lead %s has moved to stage %s') % (lead.name, lead.stage_id.name),
+        } for lead in leads]
+        return self.env['mail.activity'].with_context(mail_activity_quick_update=True).create(activity_vals_list)
     
     def action_qualify_lead(self):
         """Qualify the lead"""
@@ -301,7 +425,7 @@ class SalesLead(models.Model):
                 raise UserError(_('Lead must have a qualification score of at least 60% to be qualified.'))
             
             # Move to qualified stage
-            qualified_stage = self.env['lead.stage'].search([('name', 'ilike', 'qualified')], limit=1)
+            qualified_stage = self.env['lead.stage']._get_stage('qualified')
             if qualified_stage:
                 lead.stage_id = qualified_stage
             
@@ -338,7 +462,7 @@ class SalesLead(models.Model):
             lead.partner_id = partner
             
             # Move to won stage
-            won_stage = self.env['lead.stage'].search([('is_won', '=', True)], limit=1)
+            won_stage = self.env['lead.stage']._get_stage('won')
             if won_stage:
                 lead.stage_id = won_stage
             
@@ -388,7 +512,7 @@ class SalesLead(models.Model):
             lead.opportunity_id = opportunity
             
             # Move to converted stage
-            converted_stage = self.env['lead.stage'].search([('is_won', '=', True)], limit=1)
+            converted_stage = self.env['lead.stage']._get_stage('won')
             if converted_stage:
                 lead.stage_id = converted_stage
             
@@ -409,7 +533,7 @@ class SalesLead(models.Model):
     def action_mark_lost(self):
         """Mark lead as lost"""
         for lead in self:
-            lost_stage = self.env['lead.stage'].search([('is_lost', '=', True)], limit=1)
+            lost_stage = self.env['lead.stage']._get_stage('lost')
             if lost_stage:
                 lead.stage_id = lost_stage
             
@@ -467,7 +591,7 @@ class LeadQualificationScore(models.Model):
     _description = 'Lead Qualification Score'
 
     lead_id = fields.Many2one('sales.lead', string='Lead', required=True, ondelete='cascade')
-    criteria_id = fields.Many2one('lead.qualification.criteria', string='Criteria', required=True)
+    criteria_id = fields.Many2one('lead.qualification.criteria', string='Criteria', required=True, index=True)
     score = fields.Float('Score (0-10)', default=0.0, help='Score from 0 to 10 for this criteria')
     notes = fields.Text('Notes')
     
@@ -503,7 +627,7 @@ class LeadAnalytics(models.Model):
     def init(self):
         tools.drop_view_if_exists(self.env.cr, self._table)
         self.env.cr.execute("""
-            CREATE OR REPLACE VIEW %s AS (
+            CREATE MATERIALIZED VIEW %s AS (
                 SELECT
                     row_number() OVER () AS id,
                     DATE(l.date_created) AS date,
@@ -512,21 +636,30 @@ class LeadAnalytics(models.Model):
                     l.stage_id,
                     ta.id AS territory_id,
                     COUNT(l.id) AS lead_count,
-                    COUNT(CASE WHEN l.is_qualified THEN 1 END) AS qualified_count,
-                    COUNT(CASE WHEN ls.is_won THEN 1 END) AS converted_count,
-                    COUNT(CASE WHEN ls.is_lost THEN 1 END) AS lost_count,
+                    COUNT(*) FILTER (WHERE l.is_qualified) AS qualified_count,
+                    COUNT(*) FILTER (WHERE ls.is_won) AS converted_count,
+                    COUNT(*) FILTER (WHERE ls.is_lost) AS lost_count,
                     SUM(l.expected_revenue) AS total_revenue,
                     AVG(l.qualification_score) AS avg_qualification_score,
-                    AVG(CASE WHEN l.date_converted IS NOT NULL 
-                        THEN EXTRACT(EPOCH FROM (l.date_converted - l.date_created))/86400 
-                        END) AS avg_days_to_convert,
-                    CASE WHEN COUNT(l.id) > 0 
-                        THEN COUNT(CASE WHEN ls.is_won THEN 1 END) * 100.0 / COUNT(l.id) 
-                        ELSE 0 END AS conversion_rate
+                    AVG(EXTRACT(EPOCH FROM (l.date_converted - l.date_created))/86400)
+                        FILTER (WHERE l.date_converted IS NOT NULL) AS avg_days_to_convert,
+                    COALESCE(COUNT(*) FILTER (WHERE ls.is_won) * 100.0 / NULLIF(COUNT(l.id), 0), 0)
+                        AS conversion_rate
                 FROM sales_lead l
                 LEFT JOIN lead_stage ls ON l.stage_id = ls.id
                 LEFT JOIN sales_rep sr ON l.sales_rep_id = sr.id
                 LEFT JOIN territory_assignment ta ON sr.id = ta.sales_rep_id
                 GROUP BY DATE(l.date_created), l.sales_rep_id, l.source_id, l.stage_id, ta.id
             )
-        """ % self._table)
\ No newline at end of file
+        """ % self._table)
+        # Unique index required by REFRESH ... CONCURRENTLY, plus the usual report filters
+        self.env.cr.execute("CREATE UNIQUE INDEX %s_id_idx ON %s (id)" % (self._table, self._table))
+        self.env.cr.execute("CREATE INDEX %s_date_idx ON %s (date)" % (self._table, self._table))
+        self.env.cr.execute("CREATE INDEX %s_sales_rep_idx ON %s (sales_rep_id)" % (self._table, self._table))
+    
+    @api.model
+    def _cron_refresh(self):
+        """Refresh the materialized analytics without blocking readers"""
+        self.env.flush_all()
+        self.env.cr.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY %s" % self._table)
+        self.invalidate_model()
\ No newline at end of file
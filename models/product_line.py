@@ -2,6 +2,7 @@
 
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
+from odoo.osv import expression
 
 class ProductLine(models.Model):
     _name = 'product.line'
@@ -17,6 +18,7 @@ class ProductLine(models.Model):
     code = fields.Char(
         string='Code',
         required=True,
+        index=True,
         help='Unique code for the product line'
     )
     
@@ -61,6 +63,12 @@ class ProductLine(models.Model):
         required=True
     )
     
+    display_name = fields.Char(
+        string='Display Name',
+        compute='_compute_display_name',
+        store=True
+    )
+    
     product_count = fields.Integer(
         string='Product Count',
         compute='_compute_product_count',
@@ -69,67 +77,92 @@ class ProductLine(models.Model):
     
     territory_assignment_count = fields.Integer(
         string='Territory Assignment Count',
-        compute='_compute_territory_assignment_count',
+        compute='_compute_territory_stats',
         store=True
     )
     
     unique_geo_areas_count = fields.Integer(
         string='Unique Geographic Areas Count',
-        compute='_compute_unique_geo_areas_count',
+        compute='_compute_territory_stats',
         store=True
     )
     
     unique_sales_reps_count = fields.Integer(
         string='Unique Sales Reps Count',
-        compute='_compute_unique_sales_reps_count',
+        compute='_compute_territory_stats',
         store=True
     )
     
-    @api.depends('product_ids')
-    def _compute_product_count(self):
-        for record in self:
-            record.product_count = len(record.product_ids)
-    
-    @api.depends('territory_assignment_ids')
-    def _compute_territory_assignment_count(self):
+    @api.depends('code', 'name')
+    def _compute_display_name(self):
         for record in self:
-            record.territory_assignment_count = len(record.territory_assignment_ids)
+            record.display_name = f'[{record.code}] {record.name}'
     
-    @api.depends('territory_assignment_ids.geo_node_id')
-    def _compute_unique_geo_areas_count(self):
+    @api.depends('product_ids')
+    def _compute_product_count(self):
+        # Count relation rows in SQL rather than loading every product of every line
+        lines = self.filtered(lambda r: isinstance(r.id, int))
+        count_dict = {}
+        if lines:
+            lines.flush_recordset(['product_ids'])
+            self.env.cr.execute("""
+                SELECT rel.line_id, COUNT(rel.product_id)
+                FROM product_line_product_rel rel
+                JOIN product_product pp ON pp.id = rel.product_id AND pp.active
+                WHERE rel.line_id IN %s
+                GROUP BY rel.line_id
+            """, [tuple(lines.ids)])
+            count_dict = dict(self.env.cr.fetchall())
         for record in self:
-            unique_geo_areas = record.territory_assignment_ids.mapped('geo_node_id')
-            record.unique_geo_areas_count = len(unique_geo_areas)
-    
-    @api.depends('territory_assignment_ids.sales_rep_id')
-    def _compute_unique_sales_reps_count(self):
+            if isinstance(record.id, int):
+                record.product_count = count_dict.get(record.id, 0)
+            else:
+                record.product_count = len(record.product_ids)
+    
+    @api.depends('territory_assignment_ids', 'territory_assignment_ids.geo_node_id',
+                 'territory_assignment_ids.sales_rep_id')
+    def _compute_territory_stats(self):
+        # Assignment count and distinct areas / reps per line in one GROUP BY
+        lines = self.filtered(lambda r: isinstance(r.id, int))
+        stats = {}
+        if lines:
+            assignment_data = self.env['territory.assignment'].read_group(
+                [('product_line_id', 'in', lines.ids)],
+                ['geo_node_id:count_distinct', 'sales_rep_id:count_distinct'],
+                ['product_line_id'], lazy=False)
+            stats = {data['product_line_id'][0]: (data['__count'], data['geo_node_id'], data['sales_rep_id'])
+                     for data in assignment_data}
         for record in self:
-            unique_sales_reps = record.territory_assignment_ids.mapped('sales_rep_id')
-            record.unique_sales_reps_count = len(unique_sales_reps)
+            if isinstance(record.id, int):
+                assignment_count, geo_areas_count, sales_reps_count = stats.get(record.id, (0, 0, 0))
+            else:
+                assignments = record.territory_assignment_ids
+                assignment_count = len(assignments)
+                geo_areas_count = len(assignments.mapped('geo_node_id'))
+                sales_reps_count = len(assignments.mapped('sales_rep_id'))
+            record.territory_assignment_count = assignment_count
+            record.unique_geo_areas_count = geo_areas_count
+            record.unique_sales_reps_count = sales_reps_count
     
     @api.constrains('code')
     def _check_unique_code(self):
-        for record in self:
-            if self.search_count([('code', '=', record.code), ('id', '!=', record.id)]) > 0:
+        if len(self) == 1:
+            if self.search_count([('code', '=', self.code), ('id', '!=', self.id)], limit=1):
                 raise ValidationError('Product line code must be unique!')
-    
-    def name_get(self):
-        result = []
-        for record in self:
-            name = f'[{record.code}] {record.name}'
-            result.append((record.id, name))
-        return result
+            return
+        # Validate the whole batch at once: any code used by more than one line is a duplicate
+        code_data = self.read_group(
+            [('code', 'in', list(set(self.mapped('code'))))],
+            ['code'], ['code'])
+        if any(data['code_count'] > 1 for data in code_data):
+            raise ValidationError('Product line code must be unique!')
     
     @api.model
-    def name_search(self, name='', args=None, operator='ilike', limit=100):
-        args = args or []
-        if name:
-            records = self.search([('code', operator, name)] + args, limit=limit)
-            if not records:
-                records = self.search([('name', operator, name)] + args, limit=limit)
-        else:
-            records = self.search(args, limit=limit)
-        return records.name_get()
+    def _search_display_name(self, operator, value):
+        # Match code or name in a single query (used by name_search and display_name searches)
+        if operator in expression.NEGATIVE_TERM_OPERATORS:
+            return ['&', ('code', operator, value), ('name', operator, value)]
+        return ['|', ('code', operator, value), ('name', operator, value)]
     
     def action_view_products(self):
         """Action to view products in this line"""
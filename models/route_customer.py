@@ -1,21 +1,38 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 from odoo.exceptions import ValidationError
+from math import cos, radians
 import logging
 
+from .gps_tracking import KM_PER_DEGREE, _haversine_cos
+
 _logger = logging.getLogger(__name__)
 
 class RouteCustomer(models.Model):
     """Model to manage customers associated with dynamic routes"""
     _name = 'route.customer'
     _description = 'Route Customer Management'
+    _inherit = ['mail.thread']
     _order = 'priority desc, sequence, name'
     _rec_name = 'display_name'
+    
+    _sql_constraints = [
+        ('route_customer_unique', 'unique(route_id, customer_id)', 'This customer is already in the route!'),
+        ('latitude_range', 'CHECK(latitude BETWEEN -90 AND 90)',
+         'Latitude must be between -90 and 90 degrees.'),
+        ('longitude_range', 'CHECK(longitude BETWEEN -180 AND 180)',
+         'Longitude must be between -180 and 180 degrees.'),
+        # Only enforced once both times are set (0 means not set)
+        ('preferred_time_range',
+         'CHECK(COALESCE(preferred_time_start, 0) = 0 OR COALESCE(preferred_time_end, 0) = 0 '
+         'OR (preferred_time_start < preferred_time_end AND preferred_time_start >= 0 AND preferred_time_end <= 24))',
+         'Preferred start time must be before end time, and both must be between 0 and 24 hours.'),
+    ]
 
     # Basic Information
     name = fields.Char('Customer Name', required=True)
-    display_name = fields.Char('Display Name', compute='_compute_display_name', store=True)
+    display_name = fields.Char('Display Name', compute='_compute_display_name', store=True, precompute=True)
     customer_id = fields.Many2one('res.partner', 'Customer', required=True, 
                                  domain=[('is_company', '=', True)])
     route_id = fields.Many2one('dynamic.route', 'Route', required=True, ondelete='cascade')
@@ -123,50 +140,69 @@ class RouteCustomer(models.Model):
                                  help='This customer must be visited in the route')
     can_reschedule = fields.Boolean('Can Reschedule', default=True)
     
+    def init(self):
+        # Proximity searches narrow on a latitude band first, then on longitude
+        tools.create_index(self.env.cr, 'route_customer_lat_lng_idx', self._table,
+                           ['latitude', 'longitude'], where="latitude != 0 AND longitude != 0")
+    
     # Computed Fields
     @api.depends('name', 'customer_id.name', 'visit_type')
     def _compute_display_name(self):
+        # Read all partner names in one query before the loop
+        self.customer_id.fetch(['name'])
         for record in self:
-            if record.customer_id:
-                record.display_name = f"{record.customer_id.name} - {record.visit_type.title()}"
+            customer = record.customer_id
+            if customer:
+                record.display_name = f"{customer.name} - {record.visit_type.title()}"
             else:
                 record.display_name = record.name or 'New Route Customer'
     
     @api.depends('route_point_ids', 'route_point_ids.visit_status')
     def _compute_visit_stats(self):
+        # Count points per customer and status in one GROUP BY instead of loading every point
+        customers = self.filtered(lambda r: isinstance(r.id, int))
+        totals = {}
+        completed = {}
+        if customers:
+            point_data = self.env['dynamic.route.point'].read_group(
+                [('route_customer_id', 'in', customers.ids)],
+                ['route_customer_id'], ['route_customer_id', 'visit_status'], lazy=False)
+            for data in point_data:
+                customer_id = data['route_customer_id'][0]
+                totals[customer_id] = totals.get(customer_id, 0) + data['__count']
+                if data['visit_status'] == 'completed':
+                    completed[customer_id] = data['__count']
         for record in self:
-            points = record.route_point_ids
-            record.total_visits = len(points)
-            record.successful_visits = len(points.filtered(lambda p: p.visit_status == 'completed'))
-            record.success_rate = (record.successful_visits / record.total_visits * 100) if record.total_visits > 0 else 0
-    
-    @api.depends('route_point_ids', 'route_point_ids.actual_order_value')
+            if isinstance(record.id, int):
+                total_visits = totals.get(record.id, 0)
+                successful_visits = completed.get(record.id, 0)
+            else:
+                points = record.route_point_ids
+                total_visits = len(points)
+                successful_visits = len(points.filtered_domain([('visit_status', '=', 'completed')]))
+            record.total_visits = total_visits
+            record.successful_visits = successful_visits
+            record.success_rate = (successful_visits / total_visits * 100) if total_visits > 0 else 0
+    
+    @api.depends('route_point_ids', 'route_point_ids.visit_status', 'route_point_ids.actual_order_value')
     def _compute_financial_stats(self):
+        # Sum and count completed points of every customer in one GROUP BY
+        customers = self.filtered(lambda r: isinstance(r.id, int))
+        totals = {}
+        if customers:
+            point_data = self.env['dynamic.route.point'].read_group(
+                [('route_customer_id', 'in', customers.ids), ('visit_status', '=', 'completed')],
+                ['actual_order_value:sum'], ['route_customer_id'], lazy=False)
+            totals = {data['route_customer_id'][0]: (data['actual_order_value'], data['__count'])
+                      for data in point_data}
         for record in self:
-            completed_points = record.route_point_ids.filtered(lambda p: p.visit_status == 'completed')
-            if completed_points:
-                total_value = sum(completed_points.mapped('actual_order_value'))
-                record.average_order_value = total_value / len(completed_points)
+            if isinstance(record.id, int):
+                total_value, completed_count = totals.get(record.id, (0, 0))
             else:
-                record.average_order_value = 0
-    
-    # Constraints
-    @api.constrains('preferred_time_start', 'preferred_time_end')
-    def _check_preferred_times(self):
-        for record in self:
-            if record.preferred_time_start and record.preferred_time_end:
-                if record.preferred_time_start >= record.preferred_time_end:
-                    raise ValidationError("Preferred start time must be before end time.")
-                if record.preferred_time_start < 0 or record.preferred_time_end > 24:
-                    raise ValidationError("Preferred times must be between 0 and 24 hours.")
-    
-    @api.constrains('latitude', 'longitude')
-    def _check_coordinates(self):
-        for record in self:
-            if record.latitude and (record.latitude < -90 or record.latitude > 90):
-                raise ValidationError("Latitude must be between -90 and 90 degrees.")
-            if record.longitude and (record.longitude < -180 or record.longitude > 180):
-                raise ValidationError("Longitude must be between -180 and 180 degrees.")
+                completed_points = record.route_point_ids.filtered_domain([('visit_status', '=', 'completed')])
+                total_value = sum(completed_points.mapped('actual_order_value'))
+                completed_count = len(completed_points)
+            record.average_order_value = total_value / completed_count if completed_count else 0
     
     # Business Methods
     def action_confirm_visit(self):
@@ -174,7 +210,6 @@ class RouteCustomer(models.Model):
         self.ensure_one()
         if self.visit_status == 'planned':
             self.visit_status = 'confirmed'
-            self._log_status_change('confirmed')
         return True
     
     def action_start_visit(self):
@@ -182,7 +217,6 @@ class RouteCustomer(models.Model):
         self.ensure_one()
         if self.visit_status in ['planned', 'confirmed']:
             self.visit_status = 'in_progress'
-            self._log_status_change('in_progress')
         return True
     
     def action_complete_visit(self):
@@ -190,7 +224,6 @@ class RouteCustomer(models.Model):
         self.ensure_one()
         if self.visit_status == 'in_progress':
             self.visit_status = 'completed'
-            self._log_status_change('completed')
         return True
     
     def action_cancel_visit(self):
@@ -198,7 +231,6 @@ class RouteCustomer(models.Model):
         self.ensure_one()
         if self.visit_status not in ['completed', 'cancelled']:
             self.visit_status = 'cancelled'
-            self._log_status_change('cancelled')
         return True
     
     def action_reschedule_visit(self):
@@ -206,7 +238,6 @@ class RouteCustomer(models.Model):
         self.ensure_one()
         if self.can_reschedule and self.visit_status not in ['completed', 'cancelled']:
             self.visit_status = 'rescheduled'
-            self._log_status_change('rescheduled')
         return True
     
     def action_verify_location(self):
@@ -234,11 +265,18 @@ class RouteCustomer(models.Model):
             raise ValidationError("Customer location coordinates are not available.")
     
     def _log_status_change(self, new_status):
-        """Log status changes in chatter"""
-        self.message_post(
-            body=f"Visit status changed to: {new_status.title()}",
-            message_type='notification'
-        )
+        """Log status changes in chatter, one message per record created in a single batch"""
+        if not self:
+            return
+        body = f"Visit status changed to: {new_status.title()}"
+        subtype_id = self.env['ir.model.data']._xmlid_to_res_id('mail.mt_note')
+        self.env['mail.message'].create([{
+            'model': self._name,
+            'res_id': record.id,
+            'body': body,
+            'message_type': 'notification',
+            'subtype_id': subtype_id,
+        } for record in self])
     
     # Utility Methods
     def get_distance_from_point(self, lat, lng):
@@ -246,22 +284,75 @@ class RouteCustomer(models.Model):
         if not (self.latitude and self.longitude and lat and lng):
             return 0
         
-        # Simple distance calculation (you might want to use a more accurate method)
-        import math
-        
-        lat1, lon1 = math.radians(self.latitude), math.radians(self.longitude)
-        lat2, lon2 = math.radians(lat), math.radians(lng)
-        
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        
-        # Earth's radius in kilometers
-        r = 6371
+        lat1, lat2 = radians(self.latitude), radians(lat)
+        return _haversine_cos(lat1, radians(self.longitude), cos(lat1), lat2, radians(lng), cos(lat2))
+    
+    def get_distances_from_point(self, lat, lng):
+        """Return ``{record id: distance in km}`` from given coordinates for the whole recordset"""
+        if not (lat and lng):
+            return dict.fromkeys(self.ids, 0)
         
-        return r * c
+        # Trigonometry of the reference point is shared by every record
+        lat_rad, lng_rad = radians(lat), radians(lng)
+        cos_lat = cos(lat_rad)
+        distances = {}
+        for data in self.read(['latitude', 'longitude']):
+            if data['latitude'] and data['longitude']:
+                point_lat = radians(data['latitude'])
+                distances[data['id']] = _haversine_cos(
+                    lat_rad, lng_rad, cos_lat,
+                    point_lat, radians(data['longitude']), cos(point_lat),
+                )
+            else:
+                distances[data['id']] = 0
+        return distances
+    
+    def get_distance_matrix(self):
+        """Return ``{record id: {record id: distance in km}}`` between every pair of the recordset"""
+        # Convert each point once: radians and cos(latitude) are reused across its whole row
+        points = [
+            (data['id'], radians(data['latitude']), radians(data['longitude']), cos(radians(data['latitude'])))
+            for data in self.read(['latitude', 'longitude'])
+            if data['latitude'] and data['longitude']
+        ]
+        matrix = {record_id: dict.fromkeys(self.ids, 0) for record_id in self.ids}
+        # Distances are symmetric: compute the upper triangle and mirror it
+        for i, (id_a, lat_a, lng_a, cos_a) in enumerate(points):
+            row_a = matrix[id_a]
+            for id_b, lat_b, lng_b, cos_b in points[i + 1:]:
+                distance = _haversine_cos(lat_a, lng_a, cos_a, lat_b, lng_b, cos_b)
+                row_a[id_b] = distance
+                matrix[id_b][id_a] = distance
+        return matrix
+    
+    @api.model
+    def search_near(self, lat, lng, radius_km):
+        """Return route customers within ``radius_km`` of given coordinates, nearest first"""
+        # Bounding box in SQL (index range scan), exact haversine on the few candidates left
+        delta = radius_km / KM_PER_DEGREE
+        lat_rad, lng_rad = radians(lat), radians(lng)
+        cos_lat = cos(lat_rad)
+        lng_delta = delta / max(cos_lat, 1e-6)
+        self.flush_model(['latitude', 'longitude'])
+        self.env.cr.execute("""
+            SELECT id, latitude, longitude
+            FROM route_customer
+            WHERE latitude != 0 AND longitude != 0
+              AND latitude BETWEEN %s AND %s
+              AND longitude BETWEEN %s AND %s
+        """, [lat - delta, lat + delta, lng - lng_delta, lng + lng_delta])
+        candidates = []
+        for customer_id, customer_lat, customer_lng in self.env.cr.fetchall():
+            customer_lat_rad = radians(customer_lat)
+            distance = _haversine_cos(lat_rad, lng_rad, cos_lat,
+                                      customer_lat_rad, radians(customer_lng), cos(customer_lat_rad))
+            if distance <= radius_km:
+                candidates.append((distance, customer_id))
+        candidates.sort()
+        ordered_ids = [customer_id for _distance, customer_id in candidates]
+        # Apply record rules and the active filter while keeping the distance order
+        allowed_ids = set(self.search([('id', 'in', ordered_ids)]).ids)
+        return self.browse([customer_id for customer_id in ordered_ids if customer_id in allowed_ids])
     
     @api.model
     def create_from_customer(self, customer_id, route_id, visit_type='sales'):
@@ -293,12 +384,13 @@ class RouteCustomer(models.Model):
     
     def write(self, vals):
         """Override write to log important changes"""
+        changed = self.browse()
         if 'visit_status' in vals:
-            for record in self:
-                if record.visit_status != vals['visit_status']:
-                    record._log_status_change(vals['visit_status'])
+            changed = self.filtered(lambda r: r.visit_status != vals['visit_status'])
         
-        return super().write(vals)
+        res = super().write(vals)
+        changed._log_status_change(vals.get('visit_status'))
+        return res
 
 class RouteCustomerWizard(models.TransientModel):
     """Wizard to add multiple customers to a route"""
@@ -332,22 +424,24 @@ class RouteCustomerWizard(models.TransientModel):
         """Add selected customers to the route"""
         route_customer_obj = self.env['route.customer']
         
-        for customer in self.customer_ids:
-            # Check if customer is already in the route
-            existing = route_customer_obj.search([
-                ('route_id', '=', self.route_id.id),
-                ('customer_id', '=', customer.id)
-            ])
-            
-            if not existing:
-                route_customer_obj.create({
-                    'name': customer.name,
-                    'customer_id': customer.id,
-                    'route_id': self.route_id.id,
-                    'visit_type': self.visit_type,
-                    'priority': self.priority,
-                    'expected_duration': self.expected_duration,
-                })
+        # Skip customers already in the route (archived ones included, the pair is unique),
+        # then create the rest in one batch
+        existing_ids = set(route_customer_obj.with_context(active_test=False).search([
+            ('route_id', '=', self.route_id.id),
+            ('customer_id', 'in', self.customer_ids.ids)
+        ]).customer_id.ids)
+        
+        vals_list = [{
+            'name': customer.name,
+            'customer_id': customer.id,
+            'route_id': self.route_id.id,
+            'visit_type': self.visit_type,
+            'priority': self.priority,
+            'expected_duration': self.expected_duration,
+        } for customer in self.customer_ids if customer.id not in existing_ids]
+        
+        if vals_list:
+            route_customer_obj.create(vals_list)
         
         return {
             'type': 'ir.actions.act_window',
@@ -1,5 +1,41 @@
 from odoo import models, fields, api
-from datetime import datetime, timedelta
+from odoo.tools.safe_eval import safe_eval
+from datetime import timedelta
+
+
+def _range_today(today):
+    return today, today
+
+
+def _range_this_week(today):
+    start_of_week = today - timedelta(days=today.weekday())
+    return start_of_week, start_of_week + timedelta(days=6)
+
+
+def _range_this_month(today):
+    next_month = today.replace(day=28) + timedelta(days=4)
+    return today.replace(day=1), next_month - timedelta(days=next_month.day)
+
+
+def _range_this_quarter(today):
+    start = today.replace(month=(today.month - 1) // 3 * 3 + 1, day=1)
+    # 92 days past the first day of a quarter always lands in the next quarter's first month
+    next_quarter = (start + timedelta(days=92)).replace(day=1)
+    return start, next_quarter - timedelta(days=1)
+
+
+def _range_this_year(today):
+    return today.replace(month=1, day=1), today.replace(month=12, day=31)
+
+
+# date_range selection value -> function of today returning (date_from, date_to)
+DATE_RANGES = {
+    'today': _range_today,
+    'this_week': _range_this_week,
+    'this_month': _range_this_month,
+    'this_quarter': _range_this_quarter,
+    'this_year': _range_this_year,
+}
 
 
 class SalesDashboardWizard(models.TransientModel):
@@ -49,26 +85,9 @@ class SalesDashboardWizard(models.TransientModel):
     @api.onchange('date_range')
     def _onchange_date_range(self):
         """Set date_from and date_to based on selected range"""
-        today = datetime.now().date()
-        
-        if self.date_range == 'today':
-            self.date_from = self.date_to = today
-        elif self.date_range == 'this_week':
-            start_of_week = today - timedelta(days=today.weekday())
-            self.date_from = start_of_week
-            self.date_to = start_of_week + timedelta(days=6)
-        elif self.date_range == 'this_month':
-            self.date_from = today.replace(day=1)
-            next_month = today.replace(day=28) + timedelta(days=4)
-            self.date_to = next_month - timedelta(days=next_month.day)
-        elif self.date_range == 'this_quarter':
-            quarter = (today.month - 1) // 3 + 1
-            self.date_from = today.replace(month=(quarter - 1) * 3 + 1, day=1)
-            self.date_to = today.replace(month=quarter * 3, day=1) + timedelta(days=32)
-            self.date_to = self.date_to.replace(day=1) - timedelta(days=1)
-        elif self.date_range == 'this_year':
-            self.date_from = today.replace(month=1, day=1)
-            self.date_to = today.replace(month=12, day=31)
+        range_fn = DATE_RANGES.get(self.date_range)
+        if range_fn:
+            self.date_from, self.date_to = range_fn(fields.Date.context_today(self))
     
     def _get_domain(self):
         """Build domain for filtering records"""
@@ -98,15 +117,16 @@ class SalesDashboardWizard(models.TransientModel):
         """Generate and open the selected report"""
         self.ensure_one()
         
+        # _for_xml_id resolves the xmlid through the registry cache and reads only the action's client fields
         if self.report_type == 'visit':
-            action = self.env.ref('sales_rep_mgmt_pro.action_visit_report').read()[0]
+            action = self.env['ir.actions.actions']._for_xml_id('sales_rep_mgmt_pro.action_visit_report')
         else:
-            action = self.env.ref('sales_rep_mgmt_pro.action_route_report').read()[0]
+            action = self.env['ir.actions.actions']._for_xml_id('sales_rep_mgmt_pro.action_route_report')
         
         # Apply filters to the action context
         context = action.get('context', {})
         if isinstance(context, str):
-            context = eval(context)
+            context = safe_eval(context, {'uid': self.env.uid, 'context': self.env.context})
         
         # Add date filters
         if self.date_range == 'custom':
@@ -216,6 +236,8 @@ class SalesDashboard(models.TransientModel):
     @api.depends('sales_rep_ids', 'customer_ids', 'date_from', 'date_to')
     def _compute_kpis(self):
         """Compute KPI values based on filters"""
+        # Individual contacts count, shared by every dashboard without a customer filter
+        all_customers_count = None
         for record in self:
             domain = record._get_domain()
             
@@ -236,8 +258,9 @@ class SalesDashboard(models.TransientModel):
             record.revenue_variance = 0.0
             
             # Customer statistics
-            customers = self.env['res.partner'].search([('is_company', '=', False)])
             if record.customer_ids:
-                customers = customers.filtered(lambda c: c.id in record.customer_ids.ids)
-            
-            record.total_customers = len(customers)
\ No newline at end of file
+                record.total_customers = len(record.customer_ids.filtered_domain([('is_company', '=', False)]))
+            else:
+                if all_customers_count is None:
+                    all_customers_count = self.env['res.partner'].search_count([('is_company', '=', False)])
+                record.total_customers = all_customers_count
\ No newline at end of file
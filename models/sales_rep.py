@@ -33,6 +33,10 @@ class SalesRepresentative(models.Model):
     _order = 'name'
     _check_company_auto = True
     
+    _sql_constraints = [
+        ('code_unique', 'unique(code)', 'Sales Representative code must be unique!'),
+    ]
+    
     name = fields.Char(string='Name', required=True, tracking=True)
     code = fields.Char(string='Code', tracking=True)
     active = fields.Boolean(default=True, tracking=True)
@@ -102,11 +106,13 @@ class SalesRepresentative(models.Model):
     
     @api.constrains('code')
     def _check_code_unique(self):
-        for rep in self:
-            if rep.code:
-                domain = [('code', '=', rep.code), ('id', '!=', rep.id)]
-                if self.search_count(domain):
-                    raise ValidationError(_('Sales Representative code must be unique!'))
+        codes = list(set(code for code in self.mapped('code') if code))
+        if not codes:
+            return
+        # Validate the whole batch in one query: any code used by more than one rep is a duplicate
+        code_data = self.read_group([('code', 'in', codes)], ['code'], ['code'])
+        if any(data['code_count'] > 1 for data in code_data):
+            raise ValidationError(_('Sales Representative code must be unique!'))
     
     def name_get(self):
         result = []
@@ -18,7 +18,7 @@ class TerritoryAssignment(models.Model):
     
     # Main relationships
     product_line_id = fields.Many2one('product.line', string='Product Line', required=True, 
-                                    ondelete='cascade', tracking=True)
+                                    ondelete='cascade', tracking=True, index=True)
     geo_node_id = fields.Many2one('geo.node', string='Geographic Area', required=True, 
                                 ondelete='cascade', tracking=True)
     sales_rep_id = fields.Many2one('sales.rep', string='Sales Representative', 
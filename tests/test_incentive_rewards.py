@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestIncentiveRewardTiers(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.program = cls.env['incentive.program'].create({
+            'name': 'Tiered Program',
+            'code': 'TIER',
+            'program_type': 'performance_rating',
+            'calculation_method': 'tiered',
+            'start_date': '2024-01-01',
+            'end_date': '2024-12-31',
+        })
+        cls.env['incentive.reward.tier'].create([
+            {'program_id': cls.program.id, 'name': 'Bronze', 'min_achievement': 80,
+             'max_achievement': 100, 'reward_amount': 100},
+            {'program_id': cls.program.id, 'name': 'Silver', 'min_achievement': 100,
+             'max_achievement': 120, 'reward_amount': 200},
+            {'program_id': cls.program.id, 'name': 'Gold', 'min_achievement': 120,
+             'reward_amount': 300},
+        ])
+
+    def _tier_reward(self, percentage):
+        achievement = self.env['sales.rep.achievement'].new({'program_id': self.program.id})
+        achievement.achievement_percentage = percentage
+        return achievement._get_tiered_reward_values().get('reward_amount')
+
+    def test_tier_boundaries(self):
+        """Shared boundaries pay the lower tier, as the first ascending tier that qualifies"""
+        self.assertIsNone(self._tier_reward(79.99))
+        self.assertEqual(self._tier_reward(80), 100)
+        self.assertEqual(self._tier_reward(99.99), 100)
+        self.assertEqual(self._tier_reward(100), 100)
+        self.assertEqual(self._tier_reward(100.01), 200)
+        self.assertEqual(self._tier_reward(120), 200)
+        self.assertEqual(self._tier_reward(120.01), 300)
+        self.assertEqual(self._tier_reward(500), 300)